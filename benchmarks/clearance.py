@@ -0,0 +1,99 @@
+"""
+    Checks that the track boundaries keep half the track width away from the centerline through sharp turns,
+    for a single corner between two straights, turning either way, drawn as two points or many.
+
+    Run from the repository root:
+
+        python -m benchmarks.clearance
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from src.core.tracks import Tracks
+
+ANGLES = (30, 60, 90, 120, 140, 150, 160, 165, 170, 175)
+
+
+def corner(angle: float, leg: float, step: float) -> list:
+    """
+        A straight of length `leg`, a turn of `angle` degrees and another straight, with points `step` apart.
+
+        Returns: (list) The points of the centerline
+    """
+
+    heading = np.radians(angle)
+    count = max(1, int(round(leg / step)))
+    along = np.linspace(0, leg, count + 1)
+
+    first = np.column_stack((along - leg, np.zeros_like(along)))
+    second = np.column_stack((along[1:] * np.cos(heading), along[1:] * np.sin(heading)))
+
+    return np.vstack((first, second)).tolist()
+
+
+def clearance(boundary: list, centerline: list) -> float:
+    """
+        The closest any point of the boundary comes to a segment of the centerline.
+
+        Returns: (float) The distance in pixels
+    """
+
+    points = np.asarray(boundary, dtype=np.float64)
+    centerline = np.asarray(centerline, dtype=np.float64)
+    starts, directions = centerline[:-1], np.diff(centerline, axis=0)
+
+    t = np.sum((points[:, None] - starts) * directions, axis=2) / np.sum(directions * directions, axis=1)
+    nearest = starts + np.clip(t, 0, 1)[..., None] * directions
+
+    return float(np.hypot(*(points[:, None] - nearest).transpose(2, 0, 1)).min())
+
+
+def run(thickness: float, tolerance: float) -> list:
+    tracks = Tracks()
+    offset = thickness / 2
+    failures = []
+
+    for angle in ANGLES:
+        # Long enough straights that the two sides of the turn are a track width apart where the inside ends
+        leg = offset / np.tan(np.radians(180 - angle) / 2) + 2 * thickness
+        line = []
+
+        for step in (leg, 10):
+            for sign in (1, -1):
+                centerline = corner(sign * angle, leg, step)
+                inner, outer = tracks.expand_path(centerline, thickness)
+                for name, boundary in (("inner", inner), ("outer", outer)):
+                    distance = clearance(boundary, centerline)
+                    line.append(f"{distance:6.1f}")
+                    if distance < offset - tolerance:
+                        failures.append(f"{angle:+} degrees, {name} path every {step:.0f} px, "
+                                        f"{distance:.1f} px from the centerline")
+
+        print(f"{angle:>4} degrees  {' '.join(line)}")
+
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--thickness", type=float, default=75,
+                        help="track width in pixels")
+    parser.add_argument("--tolerance", type=float, default=1e-6,
+                        help="how much closer than half the width a boundary may come")
+    args = parser.parse_args()
+
+    failures = run(args.thickness, args.tolerance)
+
+    for failure in failures:
+        print(f"TOO CLOSE  {failure}")
+    if not failures:
+        print(f"Every boundary stays {args.thickness / 2:g} px from the centerline.")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
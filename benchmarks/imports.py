@@ -0,0 +1,165 @@
+"""
+    Checks how long every entry point takes to import in a fresh interpreter, and that the headless ones
+    never load pygame, torch or pydantic.
+
+    Run from the repository root:
+
+        python -m benchmarks.imports --output imports.json
+        python -m benchmarks.imports --compare imports.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("pygame", "torch", "pydantic")
+
+# Entry point and the heavy modules it may load
+ENTRY_POINTS = {
+    "src.core.population": (),
+    "src.core.simulation": (),
+    "src.core.genetic": (),
+    "src.core.car": (),
+    "src.core.ai_car": (),
+    "src.core.track_store": (),
+    "src.core.experience": (),
+    "src.core.checkpoint": (),
+    "benchmarks.run": (),
+    "main": ("pygame",),
+}
+
+MEASURE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(",".join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+
+def import_time(module: str) -> tuple:
+    """
+        Imports `module` in a new interpreter.
+
+        Returns: (tuple) The import time in milliseconds and the heavy modules it loaded
+    """
+
+    result = subprocess.run([sys.executable, "-c", MEASURE.format(module=module, heavy=HEAVY_MODULES)],
+                            capture_output=True, text=True, check=True)
+    seconds, loaded = result.stdout.split("\n")[-3:-1]
+
+    return float(seconds) * 1000, [name for name in loaded.split(",") if name]
+
+
+def _worker_ready(_) -> bool:
+    import src.core.genetic  # noqa: F401
+
+    return True
+
+
+def pool_start_time(workers: int, start_method: str = None) -> float:
+    """
+        Starts a pool of worker processes, as the genetic trainer does, and waits until every worker has
+        imported the training code.
+
+        Args:
+            workers (int): The number of worker processes
+            start_method (str): "fork", "spawn" or "forkserver", defaults to the platform default like the trainer
+
+        Returns: (float) The time in milliseconds
+    """
+
+    # The trainer process has the training code loaded, forked workers inherit it and spawned ones import it again
+    import src.core.genetic  # noqa: F401
+
+    start = time.perf_counter()
+    with multiprocessing.get_context(start_method).Pool(workers) as pool:
+        pool.map(_worker_ready, range(workers), chunksize=1)
+
+    return (time.perf_counter() - start) * 1000
+
+
+def run(repeats: int, workers: int, start_method: str = None) -> tuple:
+    results = {}
+    failures = []
+
+    for module, allowed in ENTRY_POINTS.items():
+        timings = []
+        for _ in range(repeats):
+            milliseconds, loaded = import_time(module)
+            timings.append(milliseconds)
+
+        results[module] = min(timings)
+        unexpected = [name for name in loaded if name not in allowed]
+        if unexpected:
+            failures.append(f"{module} imports {', '.join(unexpected)}")
+
+        print(f"{module:<30} {results[module]:>8.1f} ms  {', '.join(loaded) or '-'}")
+
+    key = f"pool[{start_method or multiprocessing.get_start_method()}/{workers}]"
+    results[key] = pool_start_time(workers, start_method)
+    print(f"{key:<30} {results[key]:>8.1f} ms")
+
+    return results, failures
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+        Flags every entry point that got slower to import by more than `threshold` against the baseline.
+
+        Returns: (list) The (key, ratio) pairs of the slowdowns
+    """
+
+    slowdowns = []
+
+    for key, milliseconds in results.items():
+        if key not in baseline:
+            continue
+
+        ratio = milliseconds / baseline[key]
+        if ratio > 1 + threshold:
+            slowdowns.append((key, ratio))
+            print(f"SLOWER  {key:<30} x{ratio:.2f}")
+
+    if not slowdowns:
+        print(f"No import is more than {threshold:.0%} slower than the baseline.")
+
+    return slowdowns
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="imports per entry point, the fastest is kept")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="size of the worker pool started")
+    parser.add_argument("--start-method", choices=multiprocessing.get_all_start_methods(),
+                        help="how the worker pool is started, the platform default otherwise")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare the results against")
+    parser.add_argument("--threshold", type=float, default=0.3,
+                        help="relative slowdown flagged by --compare")
+    args = parser.parse_args()
+
+    results, failures = run(args.repeats, args.workers, args.start_method)
+
+    for failure in failures:
+        print(f"HEAVY   {failure}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"python": sys.version, "results": results}, file, indent=4)
+
+    slowdowns = []
+    if args.compare:
+        with open(args.compare) as file:
+            slowdowns = compare(results, json.load(file)["results"], args.threshold)
+
+    return 1 if failures or slowdowns else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+    Benchmarks the geometry, physics and full headless frame of the simulation on synthetic tracks.
+
+    Run from the repository root:
+
+        python -m benchmarks.run --output baseline.json
+        python -m benchmarks.run --compare baseline.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.utils import constants
+from src.core.car import Car
+from src.core.paths import Paths
+from src.core.tracks import Tracks
+from src.core.track_index import TrackIndex
+from src.core.compiled_track import CompiledTrack
+from src.core.population import Population
+from src.core.progress import TrackProgress
+from benchmarks.synthetic import synthetic_track, points_on_track
+
+paths = Paths()
+tracks = Tracks()
+
+DEFAULT_RESOLUTIONS = (100, 1000, 5000, 20000)
+DEFAULT_CARS = (1, 100)
+QUERY_POINTS = 256
+
+
+def _make_car(inner_points, outer_points, collision_mode="segments") -> Car:
+    return Car(
+        screen=None,
+        x=0,
+        y=0,
+        dimensions=constants.CAR_DIMENSIONS,
+        path=(inner_points, outer_points),
+        show_sensors=False,
+        number_of_sensors=3,
+        collisions=False,
+        collision_mode=collision_mode,
+    )
+
+
+def geometry_benchmarks(centerline: list, inner_points: list, outer_points: list) -> dict:
+    """
+        Builds one operation per geometry query, each taking the sample number.
+    """
+
+    queries = points_on_track(centerline, QUERY_POINTS).tolist()
+    rng = np.random.default_rng(0)
+    segments = rng.uniform(0, constants.SCREEN_WIDTH, (QUERY_POINTS, 8)).tolist()
+    compiled_track = CompiledTrack(inner_points, outer_points)
+    progress = TrackProgress(centerline, closed=True)
+    query_array = np.array(queries)
+
+    car = _make_car(inner_points, outer_points)
+    mask_car = _make_car(inner_points, outer_points, "mask")
+    mask_car.track_index.mask()
+
+    def place(car, i):
+        car.x, car.y = queries[i % QUERY_POINTS]
+
+    def sense(i):
+        place(car, i)
+        car.get_sensors_distance(False)
+
+    def collide(i):
+        place(car, i)
+        car.detect_collision()
+
+    def collide_mask(i):
+        place(mask_car, i)
+        mask_car.detect_collision()
+
+    return {
+        "paths.point_in_polygon": lambda i: paths.point_in_polygon(queries[i % QUERY_POINTS], inner_points),
+        "paths.line_intersect": lambda i: paths.line_intersect(*segments[i % QUERY_POINTS]),
+        "paths.is_point_within_track": lambda i: paths.is_point_within_track(
+            *queries[i % QUERY_POINTS], inner_points, outer_points),
+        "compiled_track.is_point_within_track": lambda i: compiled_track.is_point_within_track(
+            *queries[i % QUERY_POINTS]),
+        "tracks.expand_path": lambda i: tracks.expand_path(centerline, constants.FINAL_TRACK_SIZE),
+        "tracks.erase_points": lambda i: tracks.erase_points(
+            inner_points, queries[i % QUERY_POINTS], constants.ERASER_RADIUS),
+        "track_index.build": lambda i: TrackIndex(inner_points, outer_points),
+        "track_progress.project[batch]": lambda i: progress.project(query_array[:, 0], query_array[:, 1]),
+        "car.get_sensors_distance": sense,
+        "car.detect_collision[segments]": collide,
+        "car.detect_collision[mask]": collide_mask,
+    }
+
+
+def frame_benchmark(inner_points: list, outer_points: list, cars: int, collision_mode: str):
+    """
+        Builds one full headless frame for a population: physics, collisions and sensors of every car.
+    """
+
+    population = Population(inner_points, outer_points, cars,
+                            collision_mode=collision_mode)
+    rng = np.random.default_rng(0)
+    actions = rng.integers(-1, 2, (64, cars, 2))
+
+    def frame(i):
+        if not population.alive.any():
+            population.reset()
+        population.step(actions[i % len(actions)])
+
+    return frame
+
+
+def measure(operation, budget: float, min_samples: int, max_samples: int) -> dict:
+    """
+        Times individual calls of `operation` until the time budget or the sample cap is reached, then
+        replays a few calls under tracemalloc for the peak memory.
+    """
+
+    operation(0)
+
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max_samples and (len(timings) < min_samples or time.perf_counter() - started < budget):
+        start = time.perf_counter()
+        operation(len(timings))
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    for i in range(min(min_samples, len(timings))):
+        operation(i)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    microseconds = np.array(timings) * 1e6
+    p50, p95, p99 = np.percentile(microseconds, (50, 95, 99))
+
+    return {
+        "samples": len(timings),
+        "ops_per_second": float(len(timings) / sum(timings)),
+        "mean_us": float(microseconds.mean()),
+        "p50_us": float(p50),
+        "p95_us": float(p95),
+        "p99_us": float(p99),
+        "peak_memory_kb": peak / 1024,
+    }
+
+
+def run(resolutions, cars, collision_mode: str, budget: float, min_samples: int, max_samples: int) -> dict:
+    results = {}
+
+    for resolution in resolutions:
+        centerline, inner_points, outer_points = synthetic_track(resolution)
+
+        operations = geometry_benchmarks(centerline, inner_points, outer_points)
+        for name, operation in operations.items():
+            key = f"{name}/{resolution}"
+            results[key] = measure(operation, budget, min_samples, max_samples)
+            _report(key, results[key])
+
+        for count in cars:
+            key = f"population.step[{collision_mode}]/{resolution}/{count}"
+            results[key] = measure(frame_benchmark(inner_points, outer_points, count, collision_mode),
+                                   budget, min_samples, max_samples)
+            results[key]["car_steps_per_second"] = results[key]["ops_per_second"] * count
+            _report(key, results[key])
+
+    return results
+
+
+def _report(key: str, result: dict) -> None:
+    print(f"{key:<60} {result['ops_per_second']:>12.1f} ops/s  p50 {result['p50_us']:>10.1f} us  "
+          f"p95 {result['p95_us']:>10.1f} us  peak {result['peak_memory_kb']:>9.1f} KiB")
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+        Flags every benchmark whose median latency grew by more than `threshold` against the baseline.
+
+        Returns: (list) The (key, ratio) pairs of the slowdowns
+    """
+
+    slowdowns = []
+
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+
+        ratio = result["p50_us"] / baseline[key]["p50_us"]
+        if ratio > 1 + threshold:
+            slowdowns.append((key, ratio))
+            print(f"SLOWER  {key:<60} x{ratio:.2f}")
+
+    if not slowdowns:
+        print(f"No benchmark is more than {threshold:.0%} slower than the baseline.")
+
+    return slowdowns
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", type=int, nargs="+", default=DEFAULT_RESOLUTIONS,
+                        help="total boundary points of the synthetic tracks")
+    parser.add_argument("--cars", type=int, nargs="+", default=DEFAULT_CARS,
+                        help="population sizes for the full frame benchmark")
+    parser.add_argument("--collision-mode", choices=constants.COLLISION_MODES, default=constants.COLLISION_MODE)
+    parser.add_argument("--budget", type=float, default=0.25,
+                        help="seconds spent sampling each benchmark")
+    parser.add_argument("--min-samples", type=int, default=5)
+    parser.add_argument("--max-samples", type=int, default=2000)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare the results against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown flagged by --compare")
+    args = parser.parse_args()
+
+    results = run(args.resolutions, args.cars, args.collision_mode,
+                  args.budget, args.min_samples, args.max_samples)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"python": sys.version, "platform": platform.platform(), "numpy": np.__version__,
+                       "results": results}, file, indent=4)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        if compare(results, baseline, args.threshold):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import numpy as np
+
+from src.utils import constants
+from src.core.tracks import Tracks
+
+tracks = Tracks()
+
+
+def synthetic_centerline(number_of_points: int, seed: int = 0) -> list:
+    """
+        Generates a wobbly closed loop filling most of the screen, like a hand drawn track.
+
+        Args:
+            number_of_points (int): The number of centerline points
+            seed (int): Seed of the random wobble
+
+        Returns: (list) The centerline as (x, y) tuples
+    """
+
+    rng = np.random.default_rng(seed)
+    theta = np.linspace(0, 2 * np.pi, number_of_points, endpoint=False)
+    phases = rng.uniform(0, 2 * np.pi, 3)
+
+    radius = 1 + 0.12 * np.sin(3 * theta + phases[0]) + \
+        0.06 * np.sin(5 * theta + phases[1])
+    x = constants.SCREEN_WIDTH / 2 + 0.38 * constants.SCREEN_WIDTH * radius * np.cos(theta)
+    y = constants.SCREEN_HEIGHT / 2 + 0.32 * constants.SCREEN_HEIGHT * radius * np.sin(theta + 0.1 * np.sin(phases[2]))
+
+    return list(zip(x.tolist(), y.tolist()))
+
+
+def synthetic_track(boundary_points: int, seed: int = 0) -> tuple:
+    """
+        Builds a synthetic track with roughly `boundary_points` inner and outer points in total.
+
+        Returns: (tuple) The centerline, inner points and outer points
+    """
+
+    centerline = synthetic_centerline(max(boundary_points // 2, 3), seed)
+    inner_points, outer_points = tracks.expand_path(
+        centerline, constants.FINAL_TRACK_SIZE)
+
+    return centerline, inner_points, outer_points
+
+
+def points_on_track(centerline: list, count: int, seed: int = 0) -> np.ndarray:
+    """
+        Samples `count` query points scattered around the centerline, most of them on the track.
+    """
+
+    rng = np.random.default_rng(seed)
+    centerline = np.asarray(centerline)
+    anchors = centerline[rng.integers(0, len(centerline), count)]
+
+    return anchors + rng.normal(0, constants.FINAL_TRACK_SIZE / 6, (count, 2))
@@ -1,9 +1,20 @@
+import math
+import os
+import time
+
 import pygame
 
 from src.core.tracks import Tracks
+from src.core.track_index import TrackIndex
+from src.core.track_store import TrackStore
 from src.utils import constants
+from src.utils.profiler import profiler
 from src.core.car import Car
 from src.core.ai_car import AIControlledCar
+from src.core.renderer import Renderer
+from src.core.scheduler import FixedTimestep
+from src.core.experience import ExperienceRecorder
+from src.core.episodes import EpisodeManager
 
 
 def main(ai_driving: bool):
@@ -59,8 +70,18 @@ def main(ai_driving: bool):
 
         clock.tick(constants.FPS)
 
+    drawn_points = len(points)
+    points = tracks.preprocess_path(points)
+    if drawn_points:
+        print(f"Track preprocessing: {drawn_points} -> {len(points)} points "
+              f"({1 - len(points) / drawn_points:.0%} fewer)")
+
+    closed = len(points) > 2 and math.dist(
+        points[0], points[-1]) <= constants.TRACK_CLOSING_DISTANCE
     inner_points, outer_points = tracks.expand_path(
-        points, constants.FINAL_TRACK_SIZE)
+        points, constants.FINAL_TRACK_SIZE, closed)
+
+    track_index = TrackIndex(inner_points, outer_points)
 
     # Edit screen
 
@@ -68,11 +89,17 @@ def main(ai_driving: bool):
     edit_screen = pygame.display.set_mode(constants.SCREEN_DIMENSION)
     pygame.display.set_caption(constants.FINAL_SCREEN_CAPTION)
 
+    # The whole track is drawn once, afterwards only the changed parts are redrawn
+    edit_screen.fill(constants.BLACK_COLOR)
+    tracks.draw_paths(edit_screen, inner_points, outer_points)
+    pygame.display.flip()
+
     running = True
     erasing = False
+    eraser_rect = None
 
     while running:
-        edit_screen.fill(constants.BLACK_COLOR)
+        dirty_rects = []
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -88,25 +115,46 @@ def main(ai_driving: bool):
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_RETURN:
                     running = False
+                if event.key == pygame.K_s:
+                    os.makedirs(constants.TRACKS_DIRECTORY, exist_ok=True)
+                    track_path = os.path.join(
+                        constants.TRACKS_DIRECTORY, f"{int(time.time())}{constants.TRACK_FILE_EXTENSION}")
+                    TrackStore().save(track_path, points, inner_points, outer_points, closed=closed)
+                    print(f"Track saved to {track_path}")
                 if event.key == pygame.K_ESCAPE:
                     pygame.quit()
                     return
 
+        # Clear the eraser drawn on the last frame
+        if eraser_rect is not None:
+            tracks.draw_region(edit_screen, track_index, eraser_rect)
+            dirty_rects.append(eraser_rect)
+            eraser_rect = None
+
         if erasing:
             mouse_position = pygame.mouse.get_pos()
-            pygame.draw.circle(screen, constants.WHITE_COLOR,
-                               mouse_position, constants.ERASER_RADIUS)
-            inner_points[:] = tracks.erase_points(
-                inner_points, mouse_position, constants.ERASER_RADIUS)
-            outer_points[:] = tracks.erase_points(
-                outer_points, mouse_position, constants.ERASER_RADIUS)
+            erasure = track_index.erase(
+                mouse_position, constants.ERASER_RADIUS)
+
+            for boundary, start, stop in erasure.slices:
+                del (inner_points, outer_points)[boundary][start:stop]
 
-        tracks.draw_paths(edit_screen, inner_points, outer_points)
+            if erasure.box is not None:
+                x_min, y_min, x_max, y_max = erasure.box
+                changed_rect = pygame.Rect(
+                    int(x_min), int(y_min), int(x_max - x_min) + 1, int(y_max - y_min) + 1).inflate(
+                    constants.DIRTY_RECT_MARGIN, constants.DIRTY_RECT_MARGIN)
+                tracks.draw_region(edit_screen, track_index, changed_rect)
+                dirty_rects.append(changed_rect)
+
+            eraser_rect = pygame.draw.circle(edit_screen, constants.WHITE_COLOR,
+                                             mouse_position, constants.ERASER_RADIUS)
+            dirty_rects.append(eraser_rect)
 
         starting_point_x, starting_point_y = (
             (inner_points[0][0] + outer_points[0][0]) / 2, (inner_points[0][1] + outer_points[0][1]) / 2)
 
-        pygame.display.flip()
+        pygame.display.update(dirty_rects)
 
         clock.tick(constants.FPS)
 
@@ -121,16 +169,25 @@ def main(ai_driving: bool):
 
     global car
 
+    number_of_sensors = 3
+
+    # One observation is the speed, the sensor distances and the points of the car
+    recorder = None
+    if ai_driving and constants.EXPERIENCE_RECORDING:
+        recorder = ExperienceRecorder(observation_size=number_of_sensors + 2)
+
     if ai_driving:
         car = AIControlledCar(
             screen=final_screen,
             x=starting_point_x,
             y=starting_point_y,
             show_sensors=True,
-            number_of_sensors=3,
+            number_of_sensors=number_of_sensors,
             dimensions=constants.CAR_DIMENSIONS,
             path=(inner_points, outer_points),
             collisions=True,
+            track_index=track_index,
+            recorder=recorder,
         )
 
     else:
@@ -139,43 +196,85 @@ def main(ai_driving: bool):
             x=starting_point_x,
             y=starting_point_y,
             show_sensors=True,
-            number_of_sensors=3,
+            number_of_sensors=number_of_sensors,
             dimensions=constants.CAR_DIMENSIONS,
             path=(inner_points, outer_points),
             collisions=True,
+            track_index=track_index,
         )
 
-    running = True
+    renderer = Renderer(final_screen, inner_points, outer_points, car_body)
+    scheduler = FixedTimestep()
 
-    while running:
-        final_screen.fill(constants.BLACK_COLOR)
+    # A crash ends the episode and puts the same car back at the start
+    episodes = EpisodeManager(car)
+    episodes.subscribe("crash", lambda stats: print(
+        f"Crashed! Episode {stats.number}: {stats.points} points in {stats.steps} steps"))
 
-        for event in pygame.event.get():
-            # Kill window
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                return
-
-            if event.type == pygame.KEYDOWN:
-                # Enter key
-                if event.key == pygame.K_RETURN:
-                    running = False
-                # Escape key
-                if event.key == pygame.K_ESCAPE:
-                    pygame.quit()
-                    return
-
-        keys = pygame.key.get_pressed()
-        car.move(keys)
-
-        tracks.draw_paths(final_screen, inner_points, outer_points)
-
-        car.draw(car_body)
+    def step(last):
+        crashed = car.move(keys, draw_sensors=last)
+        if last and car.show_sensors:
+            # The sensor lines are drawn at this pose, mark them before a crash puts the car back at the start
+            renderer.add_dirty(renderer.sensor_rect(car.x, car.y, car.sensors.max_distance))
+        episodes.step(crashed)
 
-        car.show_game_points()
+    running = True
 
-        pygame.display.flip()
-        clock.tick(constants.FPS)
+    try:
+        while running:
+            renderer.begin_frame()
+
+            with profiler.stage("events"):
+                for event in pygame.event.get():
+                    # Kill window
+                    if event.type == pygame.QUIT:
+                        pygame.quit()
+                        return
+
+                    if event.type == pygame.KEYDOWN:
+                        # Enter key
+                        if event.key == pygame.K_RETURN:
+                            running = False
+                        # Escape key
+                        if event.key == pygame.K_ESCAPE:
+                            pygame.quit()
+                            return
+                        # Profiler overlay
+                        if event.key == pygame.K_p:
+                            profiler.show_overlay = not profiler.show_overlay
+                        # Simulation speed
+                        if event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+                            scheduler.faster()
+                        if event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                            scheduler.slower()
+                        if event.key == pygame.K_u:
+                            scheduler.toggle_unbounded()
+
+            keys = pygame.key.get_pressed()
+            with profiler.stage("move"):
+                steps = scheduler.run(step)
+
+            if car.show_sensors and not steps:
+                # The sensor lines of the previous frame were cleared, draw them again when no step ran
+                car.get_sensors_distance(True)
+                renderer.add_dirty(renderer.sensor_rect(car.x, car.y, car.sensors.max_distance))
+
+            with profiler.stage("draw_car"):
+                renderer.draw_car(*car.interpolated_pose(scheduler.alpha))
+
+            renderer.add_dirty(car.show_game_points())
+            renderer.add_dirty(profiler.draw_overlay(final_screen))
+
+            with profiler.stage("update"):
+                renderer.end_frame()
+            clock.tick(constants.FPS)
+    finally:
+        # Also runs when the window is closed
+        if recorder is not None:
+            recorder.close()
+
+    if profiler.enabled:
+        profiler.export_json(constants.PROFILER_EXPORT_PATH)
 
     pygame.quit()
 
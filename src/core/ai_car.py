@@ -1,66 +1,44 @@
-import math
-
-from typing import List
-
+from src.utils import constants
+from src.utils.profiler import profiler
 from src.core.car import Car
 from src.core.model import Model
-from src.schemas.model_inputs import ModelInputs
-from src.core.paths import Paths
-
-paths = Paths()
+from src.schemas.observation import Observation
 
 
 class AIControlledCar(Car):
-    def __init__(self, screen, x, y, dimensions, path, show_sensors, number_of_sensors, collisions):
+    def __init__(self, screen, x, y, dimensions, path, show_sensors, number_of_sensors, collisions, track_index=None,
+                 collision_mode=constants.COLLISION_MODE, sensors=None, recorder=None):
         super().__init__(screen, x, y, dimensions, path,
-                         show_sensors, number_of_sensors, collisions)
-
-        self.model = Model()
-
-    def get_sensors_distance(self, draw_sensor: bool) -> List[tuple]:
-        if self.number_of_sensors == 3:
-            directions = [0, 45, -45]
-        elif self.number_of_sensors == 5:
-            directions = [0, 45, -45, 90, -90]
-        else:
-            raise ValueError(f"Invalid number of sensors: {
-                             self.number_of_sensors}")
-
-        sensor_distance = list()
-
-        for direction in directions:
-            angle = self.angle + direction
-            radians = math.radians(angle)
-            cos_angle = math.cos(radians)
-            sin_angle = math.sin(radians)
+                         show_sensors, number_of_sensors, collisions, track_index, collision_mode, sensors)
 
-            hit_point = None
-            max_distance = 100
+        self.model = Model(recorder)
+        self.observation = Observation(self.number_of_sensors)
+        self.observation.update(self.speed, self.sense(False), self.points)
 
-            for distance in range(max_distance):
-                x_end = self.x + distance * cos_angle
-                y_end = self.y + distance * sin_angle
+    def reset(self, initial_x=None, initial_y=None):
+        super().reset(initial_x, initial_y)
+        self.observation.update(self.speed, self.sense(False), self.points)
 
-                if not paths.is_point_within_track(x_end, y_end, self.inner_points, self.outer_points):
-                    hit_point = (x_end, y_end)
-                    break
+    def move(self, keys=None, draw_sensors=True):
+        # The action is chosen from what the car saw at the end of the previous step
+        throttle, steering = self.model.act(self.observation)
+        points = self.points
 
-            if hit_point is None:
-                x_end = self.x + max_distance * cos_angle
-                y_end = self.y + max_distance * sin_angle
-                hit_point = (x_end, y_end)
+        with profiler.stage("physics"):
+            self.update(throttle, steering)
 
-            if draw_sensor:
-                super()._draw_sensors(hit_point)
+        with profiler.stage("sensors"):
+            sensors = self.sense(self.show_sensors and draw_sensors)
 
-            distance_to_obstacle = math.sqrt(
-                (hit_point[0] - self.x) ** 2 + (hit_point[1] - self.y) ** 2)
-            sensor_distance.append(distance_to_obstacle)
+        crashed = False
+        if self.collisions:
+            with profiler.stage("collision"):
+                crashed = self.detect_collision()
 
-        return sensor_distance
+            if crashed:
+                self.speed = 0
 
-    def move(self, keys=None):
-        model_inputs = ModelInputs(
-            speed=self.speed, sensors=self.get_sensors_distance(self.show_sensors), points=self.points)
+        self.model.record(self.observation, (throttle, steering), self.points - points, crashed)
+        self.observation.update(self.speed, sensors, self.points)
 
-        self.model.show_inputs(model_inputs)
+        return crashed
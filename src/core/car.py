@@ -1,16 +1,22 @@
-import pygame
-import sys
 import math
 
+import numpy as np
+
 from typing import List
 
 from src.utils import constants
+from src.utils.profiler import profiler
 from src.core.paths import Paths
+from src.core.track_index import TrackIndex
+from src.core.sensors import SensorArray
 
 paths = Paths()
 
 
 class Car:
+    # Shared by every car, created on first use once pygame is initialised
+    font = None
+
     def __init__(
         self,
         screen,
@@ -21,6 +27,9 @@ class Car:
         show_sensors: bool,
         number_of_sensors: int,
         collisions: bool,
+        track_index=None,
+        collision_mode: str = constants.COLLISION_MODE,
+        sensors: SensorArray = None,
     ) -> None:
         """
             Creates the Car object on the game screen.
@@ -32,8 +41,12 @@ class Car:
                 dimensions (tuple(float, float)): The dimensions of the car
                 path (tuple(list[float], list[float])): The inner and outer points of the track
                 show_sensors (bool): To toggle the sensors of the car on display
-                number_of_sensors (3 or 5): The number of sensors attached to the car
+                number_of_sensors (int): The number of sensors attached to the car
                 collisions (bool): To toggle the collisions of the car within the track
+                track_index (TrackIndex): The spatial index over the track, built from the path when not given
+                collision_mode ("segments", "mask" or "swept"): Exact segment tests, lookups in the rasterized track or
+                    the whole car swept along its step
+                sensors (SensorArray): Custom sensors, with their own spread and range, instead of `number_of_sensors` default ones
 
             Returns:
                 None
@@ -42,8 +55,14 @@ class Car:
 
         self.screen = screen
         self.collisions = collisions
+        if collision_mode not in constants.COLLISION_MODES:
+            raise ValueError(f"Invalid collision mode: {collision_mode}")
+        self.collision_mode = collision_mode
+        self.time_of_impact = None
+        self.contact_segment = None
         self.show_sensors = show_sensors
-        self.number_of_sensors = number_of_sensors
+        self.sensors = sensors if sensors is not None else SensorArray(number_of_sensors)
+        self.number_of_sensors = self.sensors.number_of_sensors
         self.points = constants.CAR_INITIAL_POINTS
 
         # Set initial position and metrics of the car
@@ -52,11 +71,14 @@ class Car:
         self.y = y
         self.starting_y = y
         self.angle = constants.CAR_ANGLE
+        self.previous_pose = (x, y, self.angle)
         self.speed = constants.CAR_INITIAL_SPEED
         self.size = constants.CAR_SIZE
         self.car_length = dimensions[0]
         self.car_width = dimensions[1]
         self.car_points_factor = constants.CAR_POINTS_FACTOR
+        self.points_text = None
+        self.points_text_value = None
 
         # Set movement metrics for the car
         self.top_speed = constants.CAR_TOP_SPEED
@@ -67,83 +89,118 @@ class Car:
         # Track path
         self.inner_points = path[0]
         self.outer_points = path[1]
+        self.track_index = track_index if track_index is not None else TrackIndex(
+            self.inner_points, self.outer_points)
 
-    def reset(self, initial_x: float, initial_y: float) -> None:
+    def reset(self, initial_x: float = None, initial_y: float = None) -> None:
         """
             Resets the cars position on a crash or when the algorithm plays the game and tries to learn to drive around in the track
 
             Args:
-                initial_x (float): The initial position of x to reset the car to.
-                initial_y (float): The initial position of y to reset the car to.
+                initial_x (float): The initial position of x to reset the car to, defaults to the starting position.
+                initial_y (float): The initial position of y to reset the car to, defaults to the starting position.
 
             Returns: None
         """
 
-        self.x = initial_x
-        self.y = initial_y
+        self.x = self.starting_x if initial_x is None else initial_x
+        self.y = self.starting_y if initial_y is None else initial_y
         self.angle = constants.CAR_ANGLE
+        self.previous_pose = (self.x, self.y, self.angle)
         self.speed = constants.CAR_INITIAL_SPEED
         self.points = constants.CAR_INITIAL_POINTS
+        self.time_of_impact = None
+        self.contact_segment = None
+
+    def interpolated_pose(self, alpha: float) -> tuple:
+        """
+            Blends the pose before the last physics step with the current one, for smooth rendering between steps.
+
+            Args:
+                alpha (float): 0 for the previous pose, 1 for the current pose
+
+            Returns:
+                tuple(float, float, float): The x, y and angle to draw the car at
+        """
 
-    def show_game_points(self) -> None:
+        previous_x, previous_y, previous_angle = self.previous_pose
+
+        return (previous_x + (self.x - previous_x) * alpha,
+                previous_y + (self.y - previous_y) * alpha,
+                previous_angle + (self.angle - previous_angle) * alpha)
+
+    def show_game_points(self):
         """
             Displays the score/points of the current running game.
+
+            The text is only rendered again when the displayed score changes.
+
+            Returns:
+                pygame.Rect: The area of the screen the score was drawn on
         """
 
-        font = pygame.font.Font(None, 36)
-        points_text = font.render(
-            f"Points: {round(self.points * self.car_points_factor, 0)}", True, (255, 255, 255))
-        self.screen.blit(points_text, (constants.SCREEN_WIDTH - 150, 10))
+        import pygame
+
+        if Car.font is None:
+            Car.font = pygame.font.Font(None, 36)
+
+        value = round(self.points * self.car_points_factor, 0)
+        if value != self.points_text_value:
+            self.points_text = Car.font.render(
+                f"Points: {value}", True, (255, 255, 255))
+            self.points_text_value = value
+
+        return self.screen.blit(self.points_text, (constants.SCREEN_WIDTH - 150, 10))
+
+    def get_sensors_distance(self, draw_sensor: bool) -> List[float]:
+        """
+            Casts every sensor ray against the track boundaries in a single batched operation.
 
-    def get_sensors_distance(self, draw_sensor: bool) -> List[tuple]:
-        if self.number_of_sensors == 3:
-            directions = [0, 45, -45]
-        elif self.number_of_sensors == 5:
-            directions = [0, 45, -45, 90, -90]
+            Args:
+                draw_sensor (bool): To draw the sensor lines on the screen
 
-        for direction in directions:
-            angle = self.angle + direction
-            radians = math.radians(angle)
-            cos_angle = math.cos(radians)
-            sin_angle = math.sin(radians)
+            Returns:
+                list[float]: The distance from the car to the nearest obstacle for each sensor
+        """
 
-            # Calculate end point of the sensor line
-            hit_point = None
-            max_distance = 100
+        return self.sense(draw_sensor).tolist()
 
-            for distance in range(max_distance):
-                x_end = self.x + distance * cos_angle
-                y_end = self.y + distance * sin_angle
+    def sense(self, draw_sensor: bool) -> np.ndarray:
+        """
+            Array version of `get_sensors_distance`, for callers that copy the distances into their own buffer.
+        """
 
-                if not paths.is_point_within_track(x_end, y_end, self.inner_points, self.outer_points):
-                    hit_point = (x_end, y_end)
-                    break
+        direction_x, direction_y = self.sensors.directions(self.angle)
 
-            # If no collision is detected, draw the full sensor length
-            if hit_point is None:
-                x_end = self.x + max_distance * cos_angle
-                y_end = self.y + max_distance * sin_angle
-                hit_point = (x_end, y_end)
+        # A car already off the track sees the boundary right where it stands
+        if self.track_index.is_point_within_track(self.x, self.y):
+            sensor_distance = self.track_index.cast_directions(
+                self.x, self.y, direction_x, direction_y, self.sensors.max_distance)
+        else:
+            sensor_distance = np.zeros(self.sensors.number_of_sensors)
 
-            if draw_sensor:
+        if draw_sensor:
+            for hit_point in zip(*self.sensors.hit_points(self.x, self.y, self.angle, sensor_distance)):
                 self._draw_sensors(hit_point)
 
+        return sensor_distance
+
     def _draw_sensors(self, hit_point: tuple) -> None:
         """
             Draw the sensor lines to visualize the car's perception of its surroundings.
 
-            Has two types, one with 3 sensors and another one with 5 sensors can be set when the car object is created.
-
-            3 sensors: [0, 45, -45], in angle from the car front.
-            5 sensors: [0, 45, -45, 90, -90] in angle from the car front.
+            The number of sensors and their angles come from the `SensorArray` of the car, for example
+            3 sensors: [0, 45, -45] and 5 sensors: [0, 45, -45, 90, -90], in angle from the car front.
         """
 
+        import pygame
+
         pygame.draw.line(self.screen, constants.GREEN_COLOR,
                          (self.x, self.y), hit_point, 2)
         pygame.draw.circle(self.screen, constants.RED_COLOR,
                            (int(hit_point[0]), int(hit_point[1])), 3)
 
-    def draw(self, car_body: pygame.image) -> None:
+    def draw(self, car_body) -> None:
         """
             Draws the car object on the screen.
 
@@ -154,6 +211,8 @@ class Car:
                 None
         """
 
+        import pygame
+
         rotated_car = pygame.transform.rotate(car_body, -self.angle)
         new_rect = rotated_car.get_rect(center=(self.x, self.y))
         self.screen.blit(rotated_car, new_rect.topleft)
@@ -162,14 +221,26 @@ class Car:
         """
         Check if the car collides with the inner or outer paths.
 
+        In "mask" mode the car collides as soon as any pixel of its bounding box is off the track.
+
+        In "swept" mode the oriented box of the whole car is swept from its previous pose to the new one, turning
+        as it moves, so a fast car cannot pass through a boundary between two steps. `time_of_impact` and `contact_segment` are
+        set on a collision and the car is moved back to where it first touched the boundary.
+
         Returns:
             bool: True if the car collides with either path, False otherwise.
         """
 
+        if self.collision_mode == "swept":
+            return self._detect_swept_collision()
+
         # Car vertices based on the center position and size
         half_width = self.car_width / 4
         half_length = self.car_length / 4
 
+        if self.collision_mode == "mask":
+            return self.track_index.mask().box_collides(self.x, self.y, half_width, half_length)
+
         # Define car's bounding box (as a rectangle)
         car_vertices = [
             (self.x - half_width, self.y - half_length),  # Top-left
@@ -178,23 +249,11 @@ class Car:
             (self.x - half_width, self.y + half_length)   # Bottom-left
         ]
 
-        # Check collision with the inner path
-        for i in range(len(self.inner_points) - 1):
-            x1, y1 = self.inner_points[i]
-            x2, y2 = self.inner_points[i + 1]
-
-            for j in range(4):
-                cx1, cy1 = car_vertices[j]
-                cx2, cy2 = car_vertices[(j + 1) % 4]
-
-                if paths.line_intersect(x1, y1, x2, y2, cx1, cy1, cx2, cy2):
-                    return True
-
-        # Check collision with the outer path
-        for i in range(len(self.outer_points) - 1):
-            x1, y1 = self.outer_points[i]
-            x2, y2 = self.outer_points[i + 1]
+        # Only the segments near the car can touch its bounding box
+        nearby_segments = self.track_index.segments_in_box(
+            self.x - half_width, self.y - half_length, self.x + half_width, self.y + half_length, closed=False)
 
+        for x1, y1, x2, y2 in nearby_segments:
             for j in range(4):
                 cx1, cy1 = car_vertices[j]
                 cx2, cy2 = car_vertices[(j + 1) % 4]
@@ -204,22 +263,56 @@ class Car:
 
         return False
 
-    def move(self, key) -> None:
+    def _detect_swept_collision(self) -> bool:
+        previous_x, previous_y, previous_angle = self.previous_pose
+        half_length = self.car_length / 2
+        half_width = self.car_width / 2
+
+        # Anything the box touches on its way lies within its radius of the straight path
+        radius = math.hypot(half_length, half_width)
+        nearby_segments = self.track_index.segments_in_box(
+            min(previous_x, self.x) - radius, min(previous_y, self.y) - radius,
+            max(previous_x, self.x) + radius, max(previous_y, self.y) + radius, closed=False)
+
+        motion_x = self.x - previous_x
+        motion_y = self.y - previous_y
+        turn = self.angle - previous_angle
+        time_of_impact, contact = paths.sweep_boxes(
+            np.array([previous_x]), np.array([previous_y]), np.array([previous_angle]),
+            np.array([motion_x]), np.array([motion_y]), half_length, half_width, nearby_segments, np.array([turn]))
+
+        if contact[0] < 0:
+            self.time_of_impact = None
+            self.contact_segment = None
+            return False
+
+        self.time_of_impact = float(time_of_impact[0])
+        self.contact_segment = tuple(nearby_segments[contact[0]].tolist())
+        self.x = previous_x + motion_x * self.time_of_impact
+        self.y = previous_y + motion_y * self.time_of_impact
+        self.angle = previous_angle + turn * self.time_of_impact
+
+        return True
+
+    def update(self, throttle: int, steering: int) -> None:
         """
-            Moves around the Car object on the game screen with key presses
+            Advances the car by one physics step without reading any input device.
 
             Args:
-                key: Any pygame key press ['W', 'A', 'S', 'D'] or the arrow keys to move the car in all four directions.
+                throttle (int): 1 to accelerate, -1 to brake or reverse, 0 to coast
+                steering (int): -1 to turn left, 1 to turn right, 0 to keep the heading
 
             Returns:
                 None
         """
 
+        self.previous_pose = (self.x, self.y, self.angle)
+
         # Check if the car has gained any velocity or acceleration
-        if key[pygame.K_w] or key[pygame.K_UP]:
+        if throttle > 0:
             self.speed = min(self.speed + self.acceleration, self.top_speed)
             self.points += 1
-        elif key[pygame.K_s] or key[pygame.K_DOWN]:
+        elif throttle < 0:
             self.speed = max(self.speed - self.acceleration, -self.top_speed)
             self.points -= 1
         else:
@@ -229,9 +322,9 @@ class Car:
                 self.speed = min(self.speed + self.deceleration, 0)
 
         # Check if the car has rotated in any direction
-        if key[pygame.K_a] or key[pygame.K_LEFT]:
+        if steering < 0:
             self.angle -= self.turning_radius
-        elif key[pygame.K_d] or key[pygame.K_RIGHT]:
+        elif steering > 0:
             self.angle += self.turning_radius
 
         # Update the position of the car using the speed and the angle it has rotated
@@ -239,14 +332,51 @@ class Car:
         self.x += self.speed * math.cos(radians)
         self.y += self.speed * math.sin(radians)
 
+    def move(self, key, draw_sensors: bool = True) -> bool:
+        """
+            Moves around the Car object on the game screen with key presses
+
+            A crashed car stops, ending the episode is left to the caller, see `EpisodeManager`.
+
+            Args:
+                key: Any pygame key press ['W', 'A', 'S', 'D'] or the arrow keys to move the car in all four directions.
+                draw_sensors (bool): To draw the sensor lines, only the last of several physics steps in a frame needs to
+
+            Returns:
+                bool: True if the car crashed on this step
+        """
+
+        import pygame
+
+        if key[pygame.K_w] or key[pygame.K_UP]:
+            throttle = 1
+        elif key[pygame.K_s] or key[pygame.K_DOWN]:
+            throttle = -1
+        else:
+            throttle = 0
+
+        if key[pygame.K_a] or key[pygame.K_LEFT]:
+            steering = -1
+        elif key[pygame.K_d] or key[pygame.K_RIGHT]:
+            steering = 1
+        else:
+            steering = 0
+
+        with profiler.stage("physics"):
+            self.update(throttle, steering)
+
         # Shows sensors from the car if it is enabled
         if self.show_sensors:
-            self.get_sensors_distance(self.show_sensors)
+            with profiler.stage("sensors"):
+                self.get_sensors_distance(draw_sensors)
 
         # Applies collision to the car if it is enabled
         if self.collisions:
-            if self.detect_collision():
+            with profiler.stage("collision"):
+                collided = self.detect_collision()
+
+            if collided:
                 self.speed = 0
-                print("Crashed!")
-                pygame.quit()
-                sys.exit()
+                return True
+
+        return False
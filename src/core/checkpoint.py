@@ -0,0 +1,165 @@
+import json
+import os
+import queue
+import threading
+
+from typing import NamedTuple
+
+import numpy as np
+
+from src.utils import constants
+
+CHECKPOINT_PREFIX = "checkpoint_"
+CHECKPOINT_EXTENSION = ".npz"
+
+
+class Checkpoint(NamedTuple):
+    generation: int
+    genomes: np.ndarray
+    fitness_history: np.ndarray
+    rng_state: dict
+
+
+def checkpoint_path(directory: str, generation: int) -> str:
+    return os.path.join(directory, f"{CHECKPOINT_PREFIX}{generation:06d}{CHECKPOINT_EXTENSION}")
+
+
+def list_checkpoints(directory: str) -> list:
+    """
+        Returns: (list) The checkpoint files in the folder, oldest generation first
+    """
+
+    if not os.path.isdir(directory):
+        return []
+
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.startswith(CHECKPOINT_PREFIX) and name.endswith(CHECKPOINT_EXTENSION))
+
+
+def load_checkpoint(path: str) -> Checkpoint:
+    """
+        Reads a checkpoint written by `CheckpointWriter`.
+
+        Args:
+            path (str): The checkpoint file
+
+        Returns: (Checkpoint) The generation, genomes, fitness history and random generator state
+    """
+
+    with np.load(path) as data:
+        return Checkpoint(
+            generation=int(data["generation"]),
+            genomes=data["genomes"],
+            fitness_history=data["fitness_history"],
+            rng_state=json.loads(str(data["rng_state"])),
+        )
+
+
+class CheckpointWriter:
+    def __init__(
+        self,
+        directory: str = constants.CHECKPOINT_DIRECTORY,
+        every: int = constants.CHECKPOINT_EVERY,
+        keep: int = constants.CHECKPOINT_KEEP,
+    ) -> None:
+        """
+            Saves snapshots of a training run from a background thread.
+
+            `save` copies the state and returns straight away. The writer thread compresses it into a `.npz`
+            file next to its destination and renames it into place, so a crash mid-write leaves the previous
+            checkpoint intact, then deletes all but the newest `keep` checkpoints. A write that fails does not
+            stop the thread, the error is raised again from the next `save` or from `close`.
+
+            Args:
+                directory (str): The folder the checkpoints are written to
+                every (int): Save every `every` generations, see `due`
+                keep (int): The number of most recent checkpoints kept on disk
+
+            Returns:
+                None
+        """
+
+        os.makedirs(directory, exist_ok=True)
+
+        self.directory = directory
+        self.every = max(1, every)
+        self.keep = max(1, keep)
+
+        self.pending = queue.Queue()
+        self.error = None
+        self.writer = threading.Thread(target=self._write_checkpoints, daemon=True)
+        self.writer.start()
+
+    def due(self, generation: int) -> bool:
+        return generation % self.every == 0
+
+    def save(self, generation: int, genomes: np.ndarray, fitness_history: list, rng_state: dict) -> None:
+        """
+            Queues a snapshot of the training state for writing.
+
+            Args:
+                generation (int): The generation the genomes belong to
+                genomes (np.ndarray): The genomes, copied before this returns
+                fitness_history (list): The (best, mean) fitness of every evaluated generation
+                rng_state (dict): The `bit_generator.state` of the random number generator
+
+            Returns:
+                None
+        """
+
+        self._raise_error()
+        self.pending.put(Checkpoint(
+            generation=generation,
+            genomes=np.array(genomes, copy=True),
+            fitness_history=np.array(fitness_history, dtype=np.float64).reshape(-1, 2),
+            rng_state=json.loads(json.dumps(rng_state)),
+        ))
+
+    def _write_checkpoints(self) -> None:
+        while True:
+            checkpoint = self.pending.get()
+            if checkpoint is None:
+                return
+
+            try:
+                self._write(checkpoint)
+            except Exception as error:
+                # Only the first failure is kept, the ones after it usually share its cause
+                if self.error is None:
+                    self.error = error
+
+    def _write(self, checkpoint: Checkpoint) -> None:
+        path = checkpoint_path(self.directory, checkpoint.generation)
+        temporary_path = f"{path}.tmp"
+
+        with open(temporary_path, "wb") as file:
+            np.savez_compressed(
+                file,
+                generation=np.array(checkpoint.generation),
+                genomes=checkpoint.genomes,
+                fitness_history=checkpoint.fitness_history,
+                rng_state=np.array(json.dumps(checkpoint.rng_state)),
+            )
+        os.replace(temporary_path, path)
+
+        for old_path in list_checkpoints(self.directory)[:-self.keep]:
+            os.remove(old_path)
+
+    def close(self) -> None:
+        """
+            Waits for the queued snapshots to be written and stops the writer thread.
+        """
+
+        if self.writer is None:
+            return
+
+        self.pending.put(None)
+        self.writer.join()
+        self.writer = None
+        self._raise_error()
+
+    def _raise_error(self) -> None:
+        # Raises a failed write once, in the thread that saves
+        error, self.error = self.error, None
+        if error is not None:
+            raise error
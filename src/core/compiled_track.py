@@ -0,0 +1,154 @@
+from bisect import bisect_left
+
+import numpy as np
+
+from src.core.paths import Paths
+
+paths = Paths()
+
+
+class CompiledPolygon:
+    def __init__(self, polygon: list) -> None:
+        """
+            Splits a closed polygon into horizontal slabs between its sorted vertex heights.
+
+            Each slab keeps only the edges spanning it, so a containment query is a binary search
+            for the slab followed by the even-odd test over the few edges a horizontal line can cross.
+            The result is the same as `Paths.point_in_polygon`.
+
+            Args:
+                polygon (list): The list of points that make up the polygon
+
+            Returns:
+                None
+        """
+
+        edges = paths.boundary_segments(polygon, [])
+        self.ys = np.unique(edges[:, 1]) if len(edges) else np.empty(0)
+        self.ys_list = self.ys.tolist()
+        slab_count = max(len(self.ys) - 1, 0)
+
+        p1x, p1y, p2x, p2y = edges.T
+        y_min = np.minimum(p1y, p2y)
+        y_max = np.maximum(p1y, p2y)
+
+        # Edge e spans the slabs (ys[j], ys[j + 1]] for first[e] <= j < last[e]
+        first = np.searchsorted(self.ys, y_min)
+        last = np.searchsorted(self.ys, y_max)
+        counts = last - first
+
+        edge_ids = np.repeat(np.arange(len(edges)), counts)
+        starts = np.cumsum(counts) - counts
+        slab_ids = np.repeat(first, counts) + \
+            np.arange(len(edge_ids)) - np.repeat(starts, counts)
+
+        order = np.argsort(slab_ids, kind="stable")
+        self.edges = edges[edge_ids[order]]
+        self.offsets = np.searchsorted(
+            slab_ids[order], np.arange(slab_count + 1))
+
+        edges_list = self.edges.tolist()
+        offsets = self.offsets.tolist()
+        self.slabs = [edges_list[offsets[j]:offsets[j + 1]]
+                      for j in range(slab_count)]
+
+    def contains(self, x: float, y: float) -> bool:
+        """
+            Check if a point lies within the polygon in O(log n + k), k being the edges crossing its slab.
+        """
+
+        slab = bisect_left(self.ys_list, y) - 1
+        if slab < 0 or slab >= len(self.slabs):
+            return False
+
+        inside = False
+        for p1x, p1y, p2x, p2y in self.slabs[slab]:
+            if x <= max(p1x, p2x):
+                if p1x == p2x or x <= (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x:
+                    inside = not inside
+
+        return inside
+
+    def crossings(self, y: float) -> np.ndarray:
+        """
+            Returns the sorted x co-ordinates where the horizontal line at `y` crosses the polygon.
+
+            A point (x, y) lies within the polygon when an odd number of crossings are at or right of x.
+        """
+
+        slab = bisect_left(self.ys_list, y) - 1
+        if slab < 0 or slab >= len(self.slabs):
+            return np.empty(0)
+
+        p1x, p1y, p2x, p2y = self.edges[self.offsets[slab]:self.offsets[slab + 1]].T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_intersections = np.where(
+                p1x == p2x, p1x, (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x)
+
+        return np.sort(x_intersections)
+
+    def contains_many(self, xs, ys) -> np.ndarray:
+        """
+            Batched `contains` for arrays of points.
+
+            Args:
+                xs (np.ndarray): X co-ordinates of the points, shape (P,)
+                ys (np.ndarray): Y co-ordinates of the points, shape (P,)
+
+            Returns: (np.ndarray) A boolean array of shape (P,)
+        """
+
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+
+        slab = np.searchsorted(self.ys, ys) - 1
+        valid = (slab >= 0) & (slab < len(self.slabs))
+        slab = np.where(valid, slab, 0)
+
+        counts = np.where(valid, self.offsets[slab + 1] - self.offsets[slab], 0) \
+            if len(self.slabs) else np.zeros(len(xs), dtype=np.int64)
+        point_ids = np.repeat(np.arange(len(xs)), counts)
+        starts = np.cumsum(counts) - counts
+        entry_ids = np.repeat(self.offsets[slab], counts) + \
+            np.arange(len(point_ids)) - np.repeat(starts, counts)
+
+        p1x, p1y, p2x, p2y = self.edges[entry_ids].T
+        x = xs[point_ids]
+        y = ys[point_ids]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_intersections = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
+        crosses = (x <= np.maximum(p1x, p2x)) & (
+            (p1x == p2x) | (x <= x_intersections))
+
+        return np.bincount(point_ids[crosses], minlength=len(xs)) % 2 == 1
+
+
+class CompiledTrack:
+    def __init__(self, inner_points: list, outer_points: list) -> None:
+        """
+            Compiled inner and outer polygons of a track, valid until the track geometry changes.
+
+            Args:
+                inner_points (list): The list of inner points of the track
+                outer_points (list): The list of outer points of the track
+
+            Returns:
+                None
+        """
+
+        self.inner = CompiledPolygon(inner_points)
+        self.outer = CompiledPolygon(outer_points)
+
+    def is_point_within_track(self, x: float, y: float) -> bool:
+        """
+            Check if a point is within the track boundaries, same as `Paths.is_point_within_track`.
+        """
+
+        return self.inner.contains(x, y) != self.outer.contains(x, y)
+
+    def points_within_track(self, xs, ys) -> np.ndarray:
+        """
+            Batched `is_point_within_track` for arrays of points.
+        """
+
+        return self.inner.contains_many(xs, ys) ^ self.outer.contains_many(xs, ys)
@@ -0,0 +1,119 @@
+import math
+import time
+
+from collections import deque
+from typing import NamedTuple
+
+from src.utils import constants
+
+EVENTS = ("crash", "done")
+
+
+class EpisodeStats(NamedTuple):
+    number: int
+    reason: str
+    steps: int
+    points: float
+    distance: float
+    duration: float
+
+
+class EpisodeManager:
+    def __init__(self, car, max_steps: int = constants.EPISODE_MAX_STEPS, auto_reset: bool = True,
+                 history: int = constants.EPISODE_HISTORY) -> None:
+        """
+            Splits the life of a car into episodes that end on a crash or after `max_steps` steps.
+
+            When an episode ends, its statistics are kept and passed to the callbacks subscribed to the event,
+            then the same car object is put back at the start of the track, so no car or model is ever rebuilt.
+
+            Args:
+                car (Car): The car whose episodes are tracked
+                max_steps (int): The length after which an episode ends with "done", None for no limit
+                auto_reset (bool): Reset the car to the start of the track when an episode ends
+                history (int): The number of most recent episodes kept in `history`
+
+            Returns:
+                None
+        """
+
+        self.car = car
+        self.max_steps = max_steps
+        self.auto_reset = auto_reset
+        self.history = deque(maxlen=history)
+        self.callbacks = {event: [] for event in EVENTS}
+
+        self.episodes = 0
+        self.total_steps = 0
+        self.best_points = -math.inf
+        self.begin()
+
+    def subscribe(self, event: str, callback) -> None:
+        """
+            Calls `callback(stats)` with the `EpisodeStats` of every episode ending with `event`, "crash" or "done".
+        """
+
+        if event not in self.callbacks:
+            raise ValueError(f"Invalid episode event: {event}")
+
+        self.callbacks[event].append(callback)
+
+    def begin(self) -> None:
+        """
+            Starts a new episode from the car's current position.
+        """
+
+        self.steps = 0
+        self.distance = 0.0
+        self.started = time.perf_counter()
+
+    def step(self, crashed: bool) -> EpisodeStats:
+        """
+            Accounts for one physics step of the car, call it after every `Car.move`.
+
+            Args:
+                crashed (bool): What `Car.move` returned
+
+            Returns: (EpisodeStats) The statistics of the episode if this step ended it, None otherwise
+        """
+
+        self.steps += 1
+        previous_x, previous_y, _ = self.car.previous_pose
+        self.distance += math.hypot(self.car.x - previous_x, self.car.y - previous_y)
+
+        if crashed:
+            return self.end("crash")
+        if self.max_steps is not None and self.steps >= self.max_steps:
+            return self.end("done")
+
+        return None
+
+    def end(self, reason: str) -> EpisodeStats:
+        """
+            Ends the current episode, notifies the subscribers and starts the next one.
+
+            Returns: (EpisodeStats) The statistics of the episode
+        """
+
+        stats = EpisodeStats(
+            number=self.episodes,
+            reason=reason,
+            steps=self.steps,
+            points=round(self.car.points * self.car.car_points_factor, 1),
+            distance=self.distance,
+            duration=time.perf_counter() - self.started,
+        )
+
+        self.episodes += 1
+        self.total_steps += self.steps
+        self.best_points = max(self.best_points, stats.points)
+        self.history.append(stats)
+
+        for callback in self.callbacks[reason]:
+            callback(stats)
+
+        if self.auto_reset:
+            self.car.reset()
+        self.begin()
+
+        return stats
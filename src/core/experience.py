@@ -0,0 +1,259 @@
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+from src.utils import constants
+
+INDEX_FILE = "index.json"
+COLUMNS = ("observations", "actions", "rewards", "dones")
+
+
+class ExperienceRecorder:
+    def __init__(
+        self,
+        directory: str = constants.EXPERIENCE_DIRECTORY,
+        observation_size: int = 5,
+        action_size: int = constants.POLICY_NUMBER_OF_ACTIONS,
+        chunk_size: int = constants.EXPERIENCE_CHUNK_SIZE,
+        buffers: int = constants.EXPERIENCE_BUFFERS,
+    ) -> None:
+        """
+            Records (observation, action, reward, done) steps to disk for offline training.
+
+            Steps are copied into one of a few preallocated chunk buffers. A full chunk is handed to a
+            background thread that writes every column to its own `.npy` shard and adds the shard to
+            `index.json`. When every buffer is still waiting to be written the chunk is dropped and
+            counted in `dropped` rather than making the simulation wait, only `flush` and `close` wait for
+            a buffer so no step recorded before them is lost.
+
+            Args:
+                directory (str): The folder the shards and the index are written to
+                observation_size (int): The length of one observation, speed, sensors and points
+                action_size (int): The length of one action
+                chunk_size (int): The number of steps per shard
+                buffers (int): The number of chunk buffers, bounds the memory used
+
+            Returns:
+                None
+        """
+
+        os.makedirs(directory, exist_ok=True)
+
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.chunks = [{
+            "observations": np.empty((chunk_size, observation_size), dtype=np.float32),
+            "actions": np.empty((chunk_size, action_size), dtype=np.int8),
+            "rewards": np.empty(chunk_size, dtype=np.float32),
+            "dones": np.empty(chunk_size, dtype=bool),
+        } for _ in range(buffers)]
+
+        self.index = ExperienceReader.read_index(directory)
+        self.shard_number = len(self.index["shards"])
+        self.dropped = 0
+
+        self.free = queue.Queue()
+        for chunk in range(1, buffers):
+            self.free.put(chunk)
+        self.full = queue.Queue()
+
+        self.chunk = 0
+        self.length = 0
+
+        self.writer = threading.Thread(target=self._write_chunks, daemon=True)
+        self.writer.start()
+
+    def record(self, observation, action, reward: float, done: bool) -> None:
+        """
+            Appends a single step.
+        """
+
+        chunk = self.chunks[self.chunk]
+        chunk["observations"][self.length] = observation
+        chunk["actions"][self.length] = action
+        chunk["rewards"][self.length] = reward
+        chunk["dones"][self.length] = done
+
+        self.length += 1
+        if self.length == self.chunk_size:
+            self._hand_over()
+
+    def record_batch(self, observations: np.ndarray, actions: np.ndarray, rewards: np.ndarray, dones: np.ndarray) -> None:
+        """
+            Appends one step of many cars, such as the live cars of a `Population`.
+
+            Args:
+                observations (np.ndarray): A (N, observation_size) array
+                actions (np.ndarray): A (N, action_size) array
+                rewards (np.ndarray): A (N,) array
+                dones (np.ndarray): A (N,) array
+
+            Returns:
+                None
+        """
+
+        start, count = 0, len(observations)
+
+        while start < count:
+            end = min(count, start + self.chunk_size - self.length)
+            rows = slice(self.length, self.length + end - start)
+
+            chunk = self.chunks[self.chunk]
+            chunk["observations"][rows] = observations[start:end]
+            chunk["actions"][rows] = actions[start:end]
+            chunk["rewards"][rows] = rewards[start:end]
+            chunk["dones"][rows] = dones[start:end]
+
+            self.length += end - start
+            start = end
+            if self.length == self.chunk_size:
+                self._hand_over()
+
+    def _hand_over(self, block: bool = False) -> None:
+        # Queue the current chunk for writing and carry on in a free one, waiting for one only when blocking
+        try:
+            chunk = self.free.get(block=block)
+        except queue.Empty:
+            self.dropped += self.length
+            self.length = 0
+            return
+
+        self.full.put((self.chunk, self.length))
+        self.chunk = chunk
+        self.length = 0
+
+    def _write_chunks(self) -> None:
+        while True:
+            item = self.full.get()
+            if item is None:
+                return
+
+            chunk, length = item
+            self._write_shard(self.chunks[chunk], length)
+            self.free.put(chunk)
+
+    def _write_shard(self, chunk: dict, length: int) -> None:
+        name = f"shard_{self.shard_number:06d}"
+        self.shard_number += 1
+
+        for column in COLUMNS:
+            path = os.path.join(self.directory, f"{name}_{column}.npy")
+            temporary_path = f"{path}.tmp"
+            with open(temporary_path, "wb") as file:
+                np.save(file, chunk[column][:length])
+            os.replace(temporary_path, path)
+
+        self.index["shards"].append({"name": name, "length": length})
+        self.index["length"] += length
+
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(f"{path}.tmp", "w") as file:
+            json.dump(self.index, file, indent=4)
+        os.replace(f"{path}.tmp", path)
+
+    def flush(self) -> None:
+        """
+            Queues the steps recorded so far, even if their chunk is not full.
+        """
+
+        if self.length:
+            self._hand_over(block=True)
+
+    def close(self) -> None:
+        """
+            Writes every recorded step and stops the writer thread.
+        """
+
+        if self.writer is None:
+            return
+
+        self.flush()
+        self.full.put(None)
+        self.writer.join()
+        self.writer = None
+
+        if self.dropped:
+            print(f"Experience recorder dropped {self.dropped} steps, the disk could not keep up")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ExperienceReader:
+    def __init__(self, directory: str = constants.EXPERIENCE_DIRECTORY) -> None:
+        """
+            Streams the shards written by `ExperienceRecorder`, mapping each one from disk only when it is read.
+
+            Args:
+                directory (str): The folder holding the shards and the index
+
+            Returns:
+                None
+        """
+
+        self.directory = directory
+        self.index = self.read_index(directory)
+
+    @staticmethod
+    def read_index(directory: str) -> dict:
+        """
+            Reads `index.json`, an empty index when nothing was recorded yet.
+        """
+
+        path = os.path.join(directory, INDEX_FILE)
+        if not os.path.exists(path):
+            return {"columns": list(COLUMNS), "shards": [], "length": 0}
+
+        with open(path) as file:
+            return json.load(file)
+
+    def __len__(self) -> int:
+        return self.index["length"]
+
+    def shard(self, number: int) -> dict:
+        """
+            Maps one shard read-only.
+
+            Returns: (dict) The observations, actions, rewards and dones arrays of the shard
+        """
+
+        name = self.index["shards"][number]["name"]
+
+        return {column: np.load(os.path.join(self.directory, f"{name}_{column}.npy"), mmap_mode="r")
+                for column in COLUMNS}
+
+    def __iter__(self):
+        for number in range(len(self.index["shards"])):
+            yield self.shard(number)
+
+    def batches(self, batch_size: int, shuffle: bool = False, rng: np.random.Generator = None):
+        """
+            Yields batches of steps one shard at a time, so only one shard is ever read into memory.
+
+            Args:
+                batch_size (int): The number of steps per batch, the last batch of a shard may be smaller
+                shuffle (bool): Visit the shards, and the steps within each shard, in random order
+                rng (np.random.Generator): The random generator used to shuffle
+
+            Returns: (generator) Dicts of observations, actions, rewards and dones arrays
+        """
+
+        rng = rng if rng is not None else np.random.default_rng()
+        numbers = np.arange(len(self.index["shards"]))
+        if shuffle:
+            rng.shuffle(numbers)
+
+        for number in numbers:
+            shard = self.shard(number)
+            length = len(shard["rewards"])
+            order = rng.permutation(length) if shuffle else np.arange(length)
+
+            for start in range(0, length, batch_size):
+                rows = order[start:start + batch_size]
+                yield {column: np.asarray(shard[column][rows]) for column in COLUMNS}
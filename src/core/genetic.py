@@ -0,0 +1,352 @@
+import multiprocessing
+import time
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.utils import constants
+from src.core.policy import Policy
+from src.core.experience import ExperienceRecorder
+from src.core.checkpoint import CheckpointWriter, list_checkpoints, load_checkpoint
+from src.core.population import Population
+from src.core.progress import TrackProgress
+
+# State of a worker process, filled in once by `_init_worker`
+_worker = {}
+
+
+def rollout(population: Population, policy: Policy, genomes: np.ndarray, max_steps: int,
+            recorder: ExperienceRecorder = None, time_budget: float = None) -> np.ndarray:
+    """
+        Drives one car per genome until every car has crashed or been culled, `max_steps` have passed or the
+        time budget ran out.
+
+        Args:
+            population (Population): A population with one car per genome
+            policy (Policy): The network the genomes are read into
+            genomes (np.ndarray): A (size, genome_size) array of genomes
+            max_steps (int): The length of the episode
+            recorder (ExperienceRecorder): Records the steps of the live cars when given
+            time_budget (float): The most seconds the rollout may take, None for no limit
+
+        Returns: (np.ndarray) The fitness of every genome
+    """
+
+    observations = population.reset()
+    fitness = np.zeros(len(genomes), dtype=np.float64)
+    actions = np.zeros((len(genomes), 2), dtype=np.int8)
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+
+    for _ in range(max_steps):
+        # Only the live cars need the policy evaluated
+        live = population.active
+        actions[live] = policy.act_batch(genomes[live], observations[live])
+        previous_observations = observations
+        observations, rewards, dones = population.step(actions)
+        fitness += rewards
+
+        if recorder is not None:
+            recorder.record_batch(previous_observations[live], actions[live], rewards[live], dones[live])
+
+        if dones.all() or (deadline is not None and time.perf_counter() > deadline):
+            break
+
+    return fitness
+
+
+def _attach_worker(track_name: str, inner_count: int, outer_count: int, centerline_count: int, closed: bool,
+                   genomes_name: str, genomes_shape: tuple, number_of_sensors: int, max_steps: int,
+                   time_budget: float) -> dict:
+    """
+        Attaches to the shared track and genome buffers.
+
+        Returns: (dict) The state `_evaluate_chunk` evaluates genomes with
+    """
+
+    track_memory = shared_memory.SharedMemory(name=track_name)
+    track = np.ndarray((inner_count + outer_count + centerline_count, 2),
+                       dtype=np.float64, buffer=track_memory.buf)
+    centerline = track[inner_count + outer_count:]
+    genomes_memory = shared_memory.SharedMemory(name=genomes_name)
+
+    return dict(
+        track_memory=track_memory,
+        genomes_memory=genomes_memory,
+        inner_points=track[:inner_count],
+        outer_points=track[inner_count:inner_count + outer_count],
+        progress=TrackProgress(centerline, closed) if centerline_count else None,
+        genomes=np.ndarray(genomes_shape, dtype=np.float32,
+                           buffer=genomes_memory.buf),
+        number_of_sensors=number_of_sensors,
+        max_steps=max_steps,
+        time_budget=time_budget,
+        policy=Policy(number_of_sensors),
+        populations={},
+    )
+
+
+def _init_worker(*args) -> None:
+    """
+        Attaches a worker process to the shared track and genome buffers, see `_attach_worker`.
+    """
+
+    _worker.update(_attach_worker(*args))
+
+
+def _evaluate_chunk(bounds: tuple, worker: dict = None) -> np.ndarray:
+    """
+        Evaluates the genomes in rows [start, end) of the shared genome buffer.
+
+        Args:
+            bounds (tuple): The first and one past the last row
+            worker (dict): The state from `_attach_worker`, the state of this worker process when None
+
+        Returns: (np.ndarray) The fitness of every genome of the rows
+    """
+
+    worker = _worker if worker is None else worker
+    start, end = bounds
+    size = end - start
+
+    populations = worker["populations"]
+    if size not in populations:
+        populations[size] = Population(
+            worker["inner_points"], worker["outer_points"], size, worker["number_of_sensors"],
+            progress=worker["progress"], stagnation_steps=constants.ROLLOUT_STAGNATION_STEPS)
+
+    return rollout(populations[size], worker["policy"], worker["genomes"][start:end], worker["max_steps"],
+                   time_budget=worker["time_budget"])
+
+
+class GeneticTrainer:
+    def __init__(
+        self,
+        inner_points: list,
+        outer_points: list,
+        population_size: int = constants.GENETIC_POPULATION_SIZE,
+        workers: int = constants.GENETIC_WORKERS,
+        number_of_sensors: int = 3,
+        max_steps: int = constants.GENETIC_MAX_STEPS,
+        seed: int = None,
+        checkpoints: CheckpointWriter = None,
+        centerline: list = None,
+        closed: bool = False,
+        time_budget: float = constants.GENETIC_TIME_BUDGET,
+    ) -> None:
+        """
+            Evolves a population of policy genomes, spreading the fitness evaluation across a process pool.
+
+            The track and the genomes live in shared memory so the workers attach to them once and only
+            receive the row range to evaluate. Selection, crossover and mutation run in this process.
+
+            Args:
+                inner_points (list): The list of inner points of the track
+                outer_points (list): The list of outer points of the track
+                population_size (int): The number of genomes in each generation
+                workers (int): The number of worker processes, 1 evaluates in this process
+                number_of_sensors (int): The number of sensors attached to each car
+                max_steps (int): The length of an evaluation episode
+                seed (int): Seed of the random number generator
+                checkpoints (CheckpointWriter): Saves the training state every few generations when given
+                centerline (list): The drawn points of the track, when given the fitness is the ground covered
+                    along it instead of the game points
+                closed (bool): The centerline is a loop, as `Tracks.expand_path` was told, so progress carries on
+                    lap after lap
+                time_budget (float): The most seconds the evaluation of a generation may take, None for no limit
+
+            Returns:
+                None
+        """
+
+        self.population_size = population_size
+        self.workers = max(1, workers)
+        self.number_of_sensors = number_of_sensors
+        self.max_steps = max_steps
+        self.rng = np.random.default_rng(seed)
+        self.policy = Policy(number_of_sensors)
+        self.generation = 0
+        self.fitness_history = []
+        self.checkpoints = checkpoints
+
+        # Track geometry shared with the workers
+        centerline = np.empty((0, 2)) if centerline is None else centerline
+        track = np.vstack((np.asarray(inner_points, dtype=np.float64),
+                           np.asarray(outer_points, dtype=np.float64),
+                           np.asarray(centerline, dtype=np.float64).reshape(-1, 2)))
+        self.track_memory = shared_memory.SharedMemory(
+            create=True, size=track.nbytes)
+        np.ndarray(track.shape, dtype=np.float64,
+                   buffer=self.track_memory.buf)[:] = track
+
+        # Genomes of the current generation, rewritten in place every generation
+        genomes_shape = (population_size, self.policy.genome_size)
+        self.genomes_memory = shared_memory.SharedMemory(
+            create=True, size=int(np.prod(genomes_shape)) * np.dtype(np.float32).itemsize)
+        self.genomes = np.ndarray(
+            genomes_shape, dtype=np.float32, buffer=self.genomes_memory.buf)
+        self.genomes[:] = self.policy.random_genomes(population_size, self.rng)
+
+        self.chunks = [(int(chunk[0]), int(chunk[-1]) + 1)
+                       for chunk in np.array_split(np.arange(population_size), self.workers) if len(chunk)]
+
+        initargs = (self.track_memory.name, len(inner_points), len(outer_points), len(centerline), closed,
+                    self.genomes_memory.name, genomes_shape, number_of_sensors, max_steps, time_budget)
+
+        # A single worker runs in this process with its own state, so trainers side by side never share one
+        self.worker = None
+        if self.workers > 1:
+            self.pool = multiprocessing.Pool(
+                self.workers, initializer=_init_worker, initargs=initargs)
+        else:
+            self.pool = None
+            self.worker = _attach_worker(*initargs)
+
+    def evaluate(self) -> np.ndarray:
+        """
+            Computes the fitness of every genome of the current generation.
+
+            Returns: (np.ndarray) The fitness of every genome
+        """
+
+        if self.pool is None:
+            results = [_evaluate_chunk(chunk, self.worker) for chunk in self.chunks]
+        else:
+            results = self.pool.map(_evaluate_chunk, self.chunks)
+
+        return np.concatenate(results)
+
+    def _select(self, fitness: np.ndarray, count: int) -> np.ndarray:
+        """
+            Tournament selection, returns the indices of `count` parents.
+        """
+
+        contestants = self.rng.integers(
+            0, self.population_size, (count, constants.GENETIC_TOURNAMENT_SIZE))
+        winners = np.argmax(fitness[contestants], axis=1)
+
+        return contestants[np.arange(count), winners]
+
+    def evolve(self, fitness: np.ndarray) -> None:
+        """
+            Breeds the next generation in place from the fitness of the current one.
+
+            The best genomes are carried over unchanged, the rest are uniform crossovers of two
+            tournament-selected parents with gaussian mutation.
+
+            Args:
+                fitness (np.ndarray): The fitness of every genome of the current generation
+
+            Returns:
+                None
+        """
+
+        elite_size = min(constants.GENETIC_ELITE_SIZE, self.population_size)
+        elite = np.argsort(fitness)[::-1][:elite_size]
+        children_count = self.population_size - elite_size
+
+        mothers = self.genomes[self._select(fitness, children_count)]
+        fathers = self.genomes[self._select(fitness, children_count)]
+        children = np.where(self.rng.random(mothers.shape) < 0.5, mothers, fathers)
+
+        mutations = self.rng.random(children.shape) < constants.GENETIC_MUTATION_RATE
+        children += mutations * self.rng.normal(
+            0, constants.GENETIC_MUTATION_SCALE, children.shape).astype(np.float32)
+
+        next_generation = np.vstack((self.genomes[elite], children))
+        self.genomes[:] = next_generation
+        self.generation += 1
+
+    def save_checkpoint(self) -> None:
+        """
+            Queues a snapshot of the current generation, it is written in the background.
+        """
+
+        self.checkpoints.save(self.generation, self.genomes, self.fitness_history,
+                              self.rng.bit_generator.state)
+
+    def resume(self, path: str = None) -> bool:
+        """
+            Restores the genomes, fitness history, generation and random generator from a checkpoint.
+
+            Training continues exactly as the run that wrote the checkpoint would have.
+
+            Args:
+                path (str): The checkpoint file, defaults to the newest one in the checkpoint folder
+
+            Returns:
+                bool: True if a checkpoint was loaded, False when there is none
+        """
+
+        if path is None:
+            directory = self.checkpoints.directory if self.checkpoints is not None else constants.CHECKPOINT_DIRECTORY
+            saved = list_checkpoints(directory)
+            if not saved:
+                return False
+            path = saved[-1]
+
+        checkpoint = load_checkpoint(path)
+        if checkpoint.genomes.shape != self.genomes.shape:
+            raise ValueError(
+                f"Checkpoint genomes have shape {checkpoint.genomes.shape}, expected {self.genomes.shape}: {path}")
+
+        self.genomes[:] = checkpoint.genomes
+        self.generation = checkpoint.generation
+        self.fitness_history = [tuple(row) for row in checkpoint.fitness_history.tolist()]
+        self.rng.bit_generator.state = checkpoint.rng_state
+        print(f"Resumed from generation {self.generation}: {path}")
+
+        return True
+
+    def train(self, generations: int) -> np.ndarray:
+        """
+            Runs evaluation and evolution for the given number of generations.
+
+            Args:
+                generations (int): The number of generations to run
+
+            Returns: (np.ndarray) The best genome of the last evaluated generation
+        """
+
+        best = None
+
+        for _ in range(generations):
+            fitness = self.evaluate()
+            best = self.genomes[np.argmax(fitness)].copy()
+            self.fitness_history.append(
+                (float(fitness.max()), float(fitness.mean())))
+            print(f"Generation {self.generation}: best {fitness.max():.1f}, mean {fitness.mean():.1f}")
+            self.evolve(fitness)
+
+            if self.checkpoints is not None and self.checkpoints.due(self.generation):
+                self.save_checkpoint()
+
+        return best
+
+    def close(self) -> None:
+        """
+            Stops the worker pool, finishes writing the checkpoints and frees the shared memory.
+        """
+
+        try:
+            # A checkpoint that failed to write is raised here, after everything else is freed
+            if self.checkpoints is not None:
+                self.checkpoints.close()
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool.join()
+                self.pool = None
+            self.worker = None
+
+            # Views into the shared buffers must be released before they can be closed
+            self.genomes = None
+            for memory in (self.track_memory, self.genomes_memory):
+                memory.close()
+                memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
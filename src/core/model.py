@@ -1,23 +1,34 @@
-import torch
-import random
-import os
-import math
-
-import numpy as np
-
-from src.utils import constants
-from src.schemas.model_inputs import ModelInputs
+from src.core.experience import ExperienceRecorder
+from src.schemas.observation import Observation
 
 
 class Model:
-    def __init__(self):
+    def __init__(self, recorder: ExperienceRecorder = None):
         print("Model initialized!")
 
-    def show_inputs(self, model_input_data: ModelInputs):
-        model_input_data = {
-            "Car speed": model_input_data.speed,
-            "Sensors distance": model_input_data.sensors,
-            "Game score": model_input_data.points
-        }
+        self.recorder = recorder
+
+    def act(self, observation: Observation) -> tuple:
+        """
+            Chooses the throttle and steering for an observation. There is no trained policy yet, so the car coasts.
+
+            Returns: (tuple) The throttle and steering, each in {-1, 0, 1}
+        """
+
+        return 0, 0
+
+    def record(self, observation: Observation, action: tuple, reward: float, done: bool):
+        """
+            Passes one step to the experience recorder, does nothing without one.
+
+            Args:
+                observation (Observation): What the car saw when it chose the action
+                action (tuple): The throttle and steering it took
+                reward (float): The points it gained by taking it
+                done (bool): The car crashed on this step
+        """
+
+        if self.recorder is None:
+            return
 
-        print(model_input_data)
+        self.recorder.record(observation.values, action, reward, done)
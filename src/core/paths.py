@@ -1,5 +1,6 @@
-import pygame
-import math
+import numpy as np
+
+from src.utils import constants
 
 
 class Paths:
@@ -49,7 +50,8 @@ class Paths:
 
     def is_point_within_track(self, x: float, y: float, inner_points: list, outer_points: list) -> bool:
         """
-            Check if a point is within the track boundaries
+            Check if a point is within the track boundaries, inside exactly one of the two polygons so either
+            one may enclose the other, whichever way the track was drawn
 
             Args:
                 x (float): X co-ordinate of the point
@@ -60,4 +62,265 @@ class Paths:
             Returns: (bool) True if point is within the track boundary and False if not.
         """
 
-        return self.point_in_polygon((x, y), inner_points) and not self.point_in_polygon((x, y), outer_points)
+        return self.point_in_polygon((x, y), inner_points) != self.point_in_polygon((x, y), outer_points)
+
+    def boundary_segments(self, inner_points: list, outer_points: list) -> np.ndarray:
+        """
+            Stack the inner and outer boundaries of the track into a single array of segments.
+
+            Each boundary is closed from its last point back to its first point, matching the polygons
+            used by `point_in_polygon`, so a ray hit marks exactly where a point leaves the track.
+
+            Args:
+                inner_points (list): The list of inner points of the track
+                outer_points (list): The list of outer points of the track
+
+            Returns: (np.ndarray) An (N, 4) float array of segments as x1, y1, x2, y2
+        """
+
+        segments = []
+
+        for boundary in (inner_points, outer_points):
+            if len(boundary) < 2:
+                continue
+
+            start = np.asarray(boundary, dtype=np.float64)
+            end = np.roll(start, -1, axis=0)
+            segments.append(np.hstack((start, end)))
+
+        if not segments:
+            return np.empty((0, 4), dtype=np.float64)
+
+        return np.vstack(segments)
+
+    def cast_directions(self, x, y, direction_x, direction_y, segments: np.ndarray, max_distance: float) -> np.ndarray:
+        """
+            Compute the distance along each ray to the nearest boundary segment in one batched operation.
+
+            Args:
+                x (float or np.ndarray): X co-ordinate of the ray origin, or an array of shape (C,) for C origins
+                y (float or np.ndarray): Y co-ordinate of the ray origin, or an array of shape (C,) for C origins
+                direction_x (np.ndarray): X components of the ray directions, shape (R,) or (C, R)
+                direction_y (np.ndarray): Y components of the ray directions, shape (R,) or (C, R)
+                segments (np.ndarray): An (N, 4) array of segments as returned by `boundary_segments`
+                max_distance (float): The range of the rays, returned when nothing is hit
+
+            Returns: (np.ndarray) The hit distances, shape (R,) for a scalar origin or (C, R) otherwise
+        """
+
+        scalar_origin = np.ndim(x) == 0
+        origin_x = np.atleast_1d(np.asarray(x, dtype=np.float64))[:, None, None]
+        origin_y = np.atleast_1d(np.asarray(y, dtype=np.float64))[:, None, None]
+
+        shape = (origin_x.shape[0], np.shape(direction_x)[-1])
+        direction_x = np.broadcast_to(direction_x, shape)[:, :, None]
+        direction_y = np.broadcast_to(direction_y, shape)[:, :, None]
+
+        distances = np.full(shape, float(max_distance))
+
+        if len(segments) == 0:
+            return distances[0] if scalar_origin else distances
+
+        seg_x1, seg_y1, seg_x2, seg_y2 = segments.T
+        edge_x = seg_x2 - seg_x1
+        edge_y = seg_y2 - seg_y1
+        offset_x = seg_x1 - origin_x
+        offset_y = seg_y1 - origin_y
+
+        # Solve origin + t * direction == start + u * edge for every ray/segment pair
+        denominator = direction_x * edge_y - direction_y * edge_x
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (offset_x * edge_y - offset_y * edge_x) / denominator
+            u = (offset_x * direction_y - offset_y * direction_x) / denominator
+
+        hits = (denominator != 0) & (t >= 0) & (u >= 0) & (u <= 1)
+        t = np.where(hits, t, np.inf).min(axis=2)
+        np.minimum(distances, t, out=distances)
+
+        return distances[0] if scalar_origin else distances
+
+    def cast_paired(self, x, y, direction_x, direction_y, segments: np.ndarray, max_distance: float) -> np.ndarray:
+        """
+            `cast_directions` for origins that each have their own segment, as the candidate pairs of a `SegmentGrid`.
+
+            Args:
+                x (np.ndarray): X co-ordinates of the ray origins, shape (P,)
+                y (np.ndarray): Y co-ordinates of the ray origins, shape (P,)
+                direction_x (np.ndarray): X components of the ray directions, shape (P, R)
+                direction_y (np.ndarray): Y components of the ray directions, shape (P, R)
+                segments (np.ndarray): The segment of each origin, shape (P, 4)
+                max_distance (float): The range of the rays, returned when the segment is not hit
+
+            Returns: (np.ndarray) The hit distances, shape (P, R)
+        """
+
+        seg_x1, seg_y1, seg_x2, seg_y2 = segments[:, :, None].transpose(1, 0, 2)
+        edge_x = seg_x2 - seg_x1
+        edge_y = seg_y2 - seg_y1
+        offset_x = seg_x1 - np.asarray(x, dtype=np.float64)[:, None]
+        offset_y = seg_y1 - np.asarray(y, dtype=np.float64)[:, None]
+
+        denominator = direction_x * edge_y - direction_y * edge_x
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (offset_x * edge_y - offset_y * edge_x) / denominator
+            u = (offset_x * direction_y - offset_y * direction_x) / denominator
+
+        hits = (denominator != 0) & (t >= 0) & (u >= 0) & (u <= 1)
+
+        return np.minimum(np.where(hits, t, np.inf), float(max_distance))
+
+    def segments_intersect(self, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        """
+            Vectorised version of `line_intersect` for arrays of segments that broadcast against each other.
+
+            Args:
+                first (np.ndarray): Segments of shape (..., 4) as x1, y1, x2, y2
+                second (np.ndarray): Segments of shape (..., 4) as x1, y1, x2, y2
+
+            Returns: (np.ndarray) A boolean array, True where the segments intersect
+        """
+
+        def ccw(ax, ay, bx, by, cx, cy):
+            return (cy - ay) * (bx - ax) > (by - ay) * (cx - ax)
+
+        x1, y1, x2, y2 = np.moveaxis(first, -1, 0)
+        x3, y3, x4, y4 = np.moveaxis(second, -1, 0)
+
+        return (ccw(x1, y1, x3, y3, x4, y4) != ccw(x2, y2, x3, y3, x4, y4)) & \
+            (ccw(x1, y1, x2, y2, x3, y3) != ccw(x1, y1, x2, y2, x4, y4))
+
+    def box_corners(self, x, y, angle, half_length: float, half_width: float) -> np.ndarray:
+        """
+            Corners of oriented boxes, in order around the box.
+
+            Args:
+                x (np.ndarray): X co-ordinates of the box centres, shape (C,)
+                y (np.ndarray): Y co-ordinates of the box centres, shape (C,)
+                angle (np.ndarray): Headings in degrees, the length of the box lies along the heading, shape (C,)
+                half_length (float): Half of the box size along the heading
+                half_width (float): Half of the box size across the heading
+
+            Returns: (np.ndarray) A (C, 4, 2) array of corners
+        """
+
+        radians = np.radians(np.asarray(angle, dtype=np.float64))[:, None]
+        along = np.array([1, 1, -1, -1]) * half_length
+        across = np.array([-1, 1, 1, -1]) * half_width
+
+        corners_x = np.asarray(x, dtype=np.float64)[:, None] + along * np.cos(radians) - across * np.sin(radians)
+        corners_y = np.asarray(y, dtype=np.float64)[:, None] + along * np.sin(radians) + across * np.cos(radians)
+
+        return np.stack((corners_x, corners_y), axis=-1)
+
+    def _hit_times(self, origin_x, origin_y, motion_x, motion_y, x1, y1, x2, y2) -> np.ndarray:
+        # Fraction t in [0, 1] of the motion at which origin + t * motion crosses the segment, inf when it never does
+        edge_x = x2 - x1
+        edge_y = y2 - y1
+        offset_x = x1 - origin_x
+        offset_y = y1 - origin_y
+
+        denominator = motion_x * edge_y - motion_y * edge_x
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (offset_x * edge_y - offset_y * edge_x) / denominator
+            u = (offset_x * motion_y - offset_y * motion_x) / denominator
+
+        hits = (denominator != 0) & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+
+        return np.where(hits, t, np.inf)
+
+    def sweep_boxes(self, x, y, angle, motion_x, motion_y, half_length: float, half_width: float,
+                    segments: np.ndarray, turn=None, tolerance: float = constants.COLLISION_SWEEP_TOLERANCE) -> tuple:
+        """
+            Sweeps oriented boxes from one pose to the next and finds the first segment each one touches.
+
+            The centre moves in a straight line while the heading turns steadily by `turn`. The motion is split
+            into sub-steps, each swept in a straight line at the heading of its middle, so a corner strays at most
+            `tolerance` from where the turning box would put it. A box that does not turn is swept in one go.
+
+            Args:
+                x (np.ndarray): X co-ordinates of the box centres at the start of the motion, shape (C,)
+                y (np.ndarray): Y co-ordinates of the box centres at the start of the motion, shape (C,)
+                angle (np.ndarray): Headings of the boxes in degrees at the start of the motion, shape (C,)
+                motion_x (np.ndarray): X displacement of each box over the motion, shape (C,)
+                motion_y (np.ndarray): Y displacement of each box over the motion, shape (C,)
+                half_length (float): Half of the box size along the heading
+                half_width (float): Half of the box size across the heading
+                segments (np.ndarray): An (N, 4) array of segments shared by every box, or a (C, N, 4) array of the
+                    segments of each box, such as its candidates from a `SegmentGrid`
+                turn (np.ndarray): How many degrees each box turns over the motion, shape (C,), None for no turn
+                tolerance (float): The furthest a corner may stray from its path, in pixels
+
+            Returns: (tuple) The time of impact of each box as a fraction of its motion, inf when it touches nothing,
+                     and the index of the segment touched first, -1 when there is none
+        """
+
+        angle = np.asarray(angle, dtype=np.float64)
+        motion_x = np.asarray(motion_x, dtype=np.float64)
+        motion_y = np.asarray(motion_y, dtype=np.float64)
+        turn = np.zeros_like(angle) if turn is None else np.asarray(turn, dtype=np.float64)
+
+        # A corner at `radius` from the centre moves `radius * turn` along its arc, half of a sub-step's turn at most
+        radius = np.hypot(half_length, half_width)
+        sub_steps = max(1, int(np.ceil(radius * np.radians(np.abs(turn)).max(initial=0) / (2 * tolerance))))
+
+        time_of_impact = np.full(len(angle), np.inf)
+        contact = np.full(len(angle), -1, dtype=np.int64)
+
+        for step in range(sub_steps):
+            moving = np.flatnonzero(contact < 0)
+            if not len(moving):
+                break
+
+            start = step / sub_steps
+            times, touched = self._sweep_straight(
+                np.asarray(x)[moving] + motion_x[moving] * start, np.asarray(y)[moving] + motion_y[moving] * start,
+                angle[moving] + turn[moving] * (step + 0.5) / sub_steps,
+                motion_x[moving] / sub_steps, motion_y[moving] / sub_steps, half_length, half_width,
+                segments[moving] if segments.ndim == 3 else segments)
+
+            hit = touched >= 0
+            time_of_impact[moving[hit]] = (step + times[hit]) / sub_steps
+            contact[moving[hit]] = touched[hit]
+
+        return time_of_impact, contact
+
+    def _sweep_straight(self, x, y, angle, motion_x, motion_y, half_length: float, half_width: float,
+                        segments: np.ndarray) -> tuple:
+        # A box starting out already across a segment touches it at time 0. Otherwise the box first touches a
+        # segment either when one of its corners reaches the segment, or when one of the segment ends reaches
+        # a side of the box, so both are tested as rays along the motion.
+
+        count = len(np.atleast_1d(x))
+        if segments.shape[-2] == 0:
+            return np.full(count, np.inf), np.full(count, -1, dtype=np.int64)
+
+        # Segments as (boxes, N, 4), shared by every box or one list per box
+        segments = segments[None] if segments.ndim == 2 else segments
+
+        corners = self.box_corners(x, y, angle, half_length, half_width)
+        edges = np.concatenate((corners, np.roll(corners, -1, axis=1)), axis=-1)
+        motion_x = np.asarray(motion_x, dtype=np.float64)[:, None, None]
+        motion_y = np.asarray(motion_y, dtype=np.float64)[:, None, None]
+        x1, y1, x2, y2 = np.moveaxis(segments, -1, 0)
+
+        # Corners moving onto the segments, (C, 4, N)
+        corner_times = self._hit_times(
+            corners[:, :, 0, None], corners[:, :, 1, None], motion_x, motion_y,
+            x1[:, None], y1[:, None], x2[:, None], y2[:, None]).min(axis=1)
+
+        # Segment ends moving onto the sides of the box, in the frame of the box, (C, N, 4)
+        side = edges[:, None, :, :]
+        end_times = np.minimum(
+            self._hit_times(x1[..., None], y1[..., None], -motion_x, -motion_y, *np.moveaxis(side, -1, 0)),
+            self._hit_times(x2[..., None], y2[..., None], -motion_x, -motion_y, *np.moveaxis(side, -1, 0))).min(axis=2)
+
+        times = np.minimum(corner_times, end_times)
+
+        overlapping = self.segments_intersect(edges[:, :, None, :], segments[:, None, :, :]).any(axis=1)
+        times[overlapping] = 0
+
+        contact = np.argmin(times, axis=1)
+        time_of_impact = times[np.arange(count), contact]
+        contact[np.isinf(time_of_impact)] = -1
+
+        return time_of_impact, contact
@@ -0,0 +1,83 @@
+import numpy as np
+
+from src.utils import constants
+
+
+class Policy:
+    def __init__(self, number_of_sensors: int = 3, hidden_layers: tuple = constants.POLICY_HIDDEN_LAYERS) -> None:
+        """
+            A small feed-forward network whose weights are read from a flat genome.
+
+            Args:
+                number_of_sensors (int): The number of sensors attached to the car
+                hidden_layers (tuple(int)): The number of neurons in each hidden layer
+
+            Returns:
+                None
+        """
+
+        self.layer_sizes = (number_of_sensors + 2, *hidden_layers,
+                            constants.POLICY_NUMBER_OF_ACTIONS)
+
+        # Inputs are scaled so speed, sensors and points sit in a similar range
+        self.input_scale = np.array(
+            [1 / constants.CAR_TOP_SPEED]
+            + [1 / constants.SENSOR_MAX_DISTANCE] * number_of_sensors
+            + [constants.CAR_POINTS_FACTOR / constants.GENETIC_MAX_STEPS],
+            dtype=np.float32)
+
+        # (start, end, rows, columns) of every weight matrix and bias vector in the genome
+        self.layout = []
+        offset = 0
+        for inputs, outputs in zip(self.layer_sizes[:-1], self.layer_sizes[1:]):
+            self.layout.append((offset, offset + inputs * outputs, inputs, outputs))
+            offset += inputs * outputs
+            self.layout.append((offset, offset + outputs, 1, outputs))
+            offset += outputs
+        self.genome_size = offset
+
+    def random_genomes(self, count: int, rng: np.random.Generator) -> np.ndarray:
+        """
+            Draws `count` random genomes as a (count, genome_size) float32 array.
+        """
+
+        return rng.standard_normal((count, self.genome_size)).astype(np.float32)
+
+    def act(self, genome: np.ndarray, observation: np.ndarray) -> np.ndarray:
+        """
+            Runs the network of one genome on one observation.
+
+            Args:
+                genome (np.ndarray): The flat weights of the network
+                observation (np.ndarray): The speed, sensor distances and points of the car
+
+            Returns: (np.ndarray) The throttle and steering, each in {-1, 0, 1}
+        """
+
+        return self.act_batch(genome[None, :], np.asarray(observation)[None, :])[0]
+
+    def act_batch(self, genomes: np.ndarray, observations: np.ndarray) -> np.ndarray:
+        """
+            Runs every car through its own network in one forward pass.
+
+            The weight matrices are strided views into the (num_cars, genome_size) genome array,
+            so nothing is copied or rebuilt per car.
+
+            Args:
+                genomes (np.ndarray): A (num_cars, genome_size) array, one flat genome per car
+                observations (np.ndarray): A (num_cars, num_sensors + 2) array of speed, sensors and points
+
+            Returns: (np.ndarray) A (num_cars, 2) int8 array of throttle and steering, each in {-1, 0, 1}
+        """
+
+        count = len(genomes)
+        activation = (observations * self.input_scale)[:, None, :]
+
+        for layer in range(0, len(self.layout), 2):
+            w_start, w_end, rows, columns = self.layout[layer]
+            b_start, b_end, _, _ = self.layout[layer + 1]
+            weights = genomes[:, w_start:w_end].reshape(count, rows, columns)
+            biases = genomes[:, None, b_start:b_end]
+            activation = np.tanh(np.matmul(activation, weights) + biases)
+
+        return np.rint(activation[:, 0, :]).astype(np.int8)
@@ -0,0 +1,429 @@
+import numpy as np
+
+from src.utils import constants
+from src.utils.profiler import profiler
+from src.core.paths import Paths
+from src.core.compiled_track import CompiledTrack
+from src.core.segment_grid import SegmentGrid
+from src.core.track_mask import TrackMask
+from src.core.sensors import SensorArray
+from src.core.progress import TrackProgress, ProgressTracker
+
+paths = Paths()
+
+
+class Population:
+    def __init__(
+        self,
+        inner_points: list,
+        outer_points: list,
+        size: int,
+        number_of_sensors: int = 3,
+        dimensions: tuple = constants.CAR_DIMENSIONS,
+        start: tuple = None,
+        chunk_size: int = constants.POPULATION_CHUNK_SIZE,
+        collision_mode: str = constants.COLLISION_MODE,
+        sensors: SensorArray = None,
+        progress: TrackProgress = None,
+        stagnation_steps: int = 0,
+        stagnation_distance: float = constants.ROLLOUT_STAGNATION_DISTANCE,
+    ) -> None:
+        """
+            Holds the state of a whole population of cars as contiguous arrays and steps them together.
+
+            The kinematics, sensors and collisions are the same as `Car.update`, `Car.get_sensors_distance`
+            and `Car.detect_collision`, applied to every live car in one call. Cars that crash, or that go
+            `stagnation_steps` steps without getting `stagnation_distance` further, are culled and dropped from
+            `active`, the cars every step works on.
+
+            Args:
+                inner_points (list): The list of inner points of the track
+                outer_points (list): The list of outer points of the track
+                size (int): The number of cars in the population
+                number_of_sensors (int): The number of sensors attached to each car
+                dimensions (tuple(float, float)): The dimensions of each car
+                start (tuple(float, float)): The starting point of the cars, defaults to the start of the track
+                chunk_size (int): The number of cars tested against the track at once, bounds the memory used
+                collision_mode ("segments", "mask" or "swept"): Exact segment tests, lookups in the rasterized track or
+                    the whole car swept along its step, see `Car.detect_collision`
+                sensors (SensorArray): Custom sensors, with their own spread and range, instead of `number_of_sensors` default ones
+                progress (TrackProgress): The centerline of the track, when given cars are rewarded for the new ground
+                    they cover along it instead of for holding the throttle
+                stagnation_steps (int): The steps a car may go without getting anywhere, 0 never culls a car, see
+                    `ROLLOUT_STAGNATION_STEPS` for training
+                stagnation_distance (float): How much further along the track, or away from where it last got
+                    somewhere without a centerline, a car must get to not be stagnating
+
+            Returns:
+                None
+        """
+
+        if collision_mode not in constants.COLLISION_MODES:
+            raise ValueError(f"Invalid collision mode: {collision_mode}")
+
+        self.size = size
+        self.collision_mode = collision_mode
+        self.sensors = sensors if sensors is not None else SensorArray(number_of_sensors)
+        self.number_of_sensors = number_of_sensors = self.sensors.number_of_sensors
+        self.chunk_size = chunk_size
+        self.stagnation_steps = stagnation_steps
+        self.stagnation_distance = stagnation_distance
+
+        # Track geometry, each boundary closed back to its first point
+        self.inner_segments = paths.boundary_segments(inner_points, [])
+        self.outer_segments = paths.boundary_segments([], outer_points)
+        self.segments = np.vstack((self.inner_segments, self.outer_segments))
+        self.open_segments = np.vstack(
+            (self.inner_segments[:-1], self.outer_segments[:-1]))
+        self.segment_grid = SegmentGrid(self.segments)
+        self.open_segment_grid = SegmentGrid(self.open_segments)
+        self.compiled_track = CompiledTrack(inner_points, outer_points)
+        self.track_mask = TrackMask(
+            self.compiled_track) if collision_mode == "mask" else None
+
+        if start is None:
+            start = ((inner_points[0][0] + outer_points[0][0]) / 2,
+                     (inner_points[0][1] + outer_points[0][1]) / 2)
+        self.start = start
+
+        self.half_width = dimensions[1] / 4
+        self.half_length = dimensions[0] / 4
+        self.top_speed = constants.CAR_TOP_SPEED
+        self.acceleration = constants.CAR_ACCELERATION
+        self.deceleration = constants.CAR_DECELERATION
+        self.turning_radius = constants.CAR_TURNING_RADIUS
+        self.car_points_factor = constants.CAR_POINTS_FACTOR
+
+        # Car state as structure of arrays
+        self.x = np.empty(size, dtype=np.float64)
+        self.y = np.empty(size, dtype=np.float64)
+        self.angle = np.empty(size, dtype=np.float64)
+        self.speed = np.empty(size, dtype=np.float64)
+        self.points = np.empty(size, dtype=np.float64)
+        self.alive = np.empty(size, dtype=bool)
+        self.crashed = np.empty(size, dtype=bool)
+        self.culled = np.empty(size, dtype=bool)
+        self.idle_steps = np.empty(size, dtype=np.int64)
+        self.anchor = np.empty((3, size), dtype=np.float64)
+        self.time_of_impact = np.empty(size, dtype=np.float64)
+        self.contact_segment = np.empty(size, dtype=np.int64)
+        self.previous_pose = np.empty((3, size), dtype=np.float64)
+        self.observations = np.zeros(
+            (size, number_of_sensors + 2), dtype=np.float32)
+        self.progress = ProgressTracker(progress, size) if progress is not None else None
+
+        self.reset()
+
+    def reset(self) -> np.ndarray:
+        """
+            Puts every car back at the start of the track.
+
+            Returns: (np.ndarray) The observations of all cars
+        """
+
+        self.x[:] = self.start[0]
+        self.y[:] = self.start[1]
+        self.angle[:] = constants.CAR_ANGLE
+        self.speed[:] = constants.CAR_INITIAL_SPEED
+        self.points[:] = constants.CAR_INITIAL_POINTS
+        self.alive[:] = True
+        self.crashed[:] = False
+        self.culled[:] = False
+        self.active = np.arange(self.size)
+        self.time_of_impact[:] = np.inf
+        self.contact_segment[:] = -1
+        if self.progress is not None:
+            self.progress.reset(self.x, self.y)
+        self.previous_pose[:] = self.x, self.y, self.angle
+        self.idle_steps[:] = 0
+        self.anchor[:2] = self.x, self.y
+        self.anchor[2] = 0
+
+        return self.observe()
+
+    def _chunks(self, indices: np.ndarray):
+        for start in range(0, len(indices), self.chunk_size):
+            yield slice(start, start + self.chunk_size)
+
+    def within_track(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+            Vectorised `Paths.is_point_within_track` for many points.
+        """
+
+        return self.compiled_track.points_within_track(xs, ys)
+
+    def sensors_distance(self, indices: np.ndarray) -> np.ndarray:
+        """
+            Casts the sensor rays of the given cars against the track.
+
+            Args:
+                indices (np.ndarray): The cars to sense for
+
+            Returns: (np.ndarray) A (len(indices), number_of_sensors) array of distances
+        """
+
+        distances = np.zeros((len(indices), self.number_of_sensors))
+        max_distance = self.sensors.max_distance
+
+        for chunk in self._chunks(indices):
+            cars = indices[chunk]
+            xs, ys = self.x[cars], self.y[cars]
+
+            # A car already off the track sees the boundary right where it stands
+            on_track = np.flatnonzero(self.within_track(xs, ys))
+            xs, ys = xs[on_track], ys[on_track]
+            direction_x, direction_y = self.sensors.directions(self.angle[cars][on_track])
+            ends_x = xs[:, None] + direction_x * max_distance
+            ends_y = ys[:, None] + direction_y * max_distance
+
+            # Each car is only cast against the segments around its rays
+            owners, candidates = self.segment_grid.candidates_in_boxes(
+                np.minimum(xs, ends_x.min(axis=1)), np.minimum(ys, ends_y.min(axis=1)),
+                np.maximum(xs, ends_x.max(axis=1)), np.maximum(ys, ends_y.max(axis=1)))
+
+            sensed = np.full((len(on_track), self.number_of_sensors), float(max_distance))
+            if len(owners):
+                hits = paths.cast_paired(xs[owners], ys[owners], direction_x[owners], direction_y[owners],
+                                         self.segments[candidates], max_distance)
+                first = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+                sensed[owners[first]] = np.minimum.reduceat(hits, first, axis=0)
+
+            distances[chunk][on_track] = sensed
+
+        return distances
+
+    def detect_collisions(self, indices: np.ndarray) -> np.ndarray:
+        """
+            Tests the bounding boxes of the given cars against the open boundary segments, or the track mask in "mask" mode.
+
+            Args:
+                indices (np.ndarray): The cars to test
+
+            Returns: (np.ndarray) A boolean array, True where the car collides with the track
+        """
+
+        if self.collision_mode == "swept":
+            return self.detect_swept_collisions(indices)
+
+        if self.track_mask is not None:
+            return self.track_mask.boxes_collide(
+                self.x[indices], self.y[indices], self.half_width, self.half_length)
+
+        collided = np.zeros(len(indices), dtype=bool)
+
+        for chunk in self._chunks(indices):
+            cars = indices[chunk]
+            left = self.x[cars] - self.half_width
+            right = self.x[cars] + self.half_width
+            top = self.y[cars] - self.half_length
+            bottom = self.y[cars] + self.half_length
+
+            # The four edges of each box as (cars, 4, 4) segments
+            edges = np.stack((
+                np.stack((left, top, right, top), axis=-1),
+                np.stack((right, top, right, bottom), axis=-1),
+                np.stack((right, bottom, left, bottom), axis=-1),
+                np.stack((left, bottom, left, top), axis=-1),
+            ), axis=1)
+
+            # Each box is only tested against the segments of the grid cells it covers
+            owners, candidates = self.open_segment_grid.candidates_in_boxes(left, top, right, bottom)
+            hits = paths.segments_intersect(
+                self.open_segments[candidates, None, :], edges[owners]).any(axis=1)
+            collided[chunk][owners[hits]] = True
+
+        return collided
+
+    def detect_swept_collisions(self, indices: np.ndarray) -> np.ndarray:
+        """
+            Vectorised "swept" mode of `Car.detect_collision`, sweeps the whole car from its previous pose.
+
+            Sets `time_of_impact` and `contact_segment`, an index into `open_segments`, of the cars that collide and
+            moves them back to where they first touched the boundary.
+
+            Args:
+                indices (np.ndarray): The cars to test
+
+            Returns: (np.ndarray) A boolean array, True where the car collides with the track
+        """
+
+        half_length = self.half_length * 2
+        half_width = self.half_width * 2
+        radius = np.hypot(half_length, half_width)
+        collided = np.zeros(len(indices), dtype=bool)
+
+        for chunk in self._chunks(indices):
+            cars = indices[chunk]
+            previous_x, previous_y, previous_angle = self.previous_pose[:, cars]
+            motion_x = self.x[cars] - previous_x
+            motion_y = self.y[cars] - previous_y
+            turn = self.angle[cars] - previous_angle
+
+            # Each car is only swept against the segments within reach of its own path
+            owners, candidates = self.open_segment_grid.candidates_in_boxes(
+                np.minimum(previous_x, self.x[cars]) - radius, np.minimum(previous_y, self.y[cars]) - radius,
+                np.maximum(previous_x, self.x[cars]) + radius, np.maximum(previous_y, self.y[cars]) + radius)
+            if not len(owners):
+                continue
+
+            times = paths.sweep_boxes(
+                previous_x[owners], previous_y[owners], previous_angle[owners], motion_x[owners], motion_y[owners],
+                half_length, half_width, self.open_segments[candidates, None, :], turn[owners])[0]
+
+            # The earliest contact of every car, the lowest segment on a tie, like sweeping the car on its own
+            order = np.lexsort((candidates, times, owners))
+            first = order[np.flatnonzero(np.r_[True, owners[order][1:] != owners[order][:-1]])]
+            first = first[np.isfinite(times[first])]
+
+            hit = owners[first]
+            collided[chunk][hit] = True
+            hit_cars = cars[hit]
+            time_of_impact = times[first]
+            self.time_of_impact[hit_cars] = time_of_impact
+            self.contact_segment[hit_cars] = candidates[first]
+            self.x[hit_cars] = previous_x[hit] + motion_x[hit] * time_of_impact
+            self.y[hit_cars] = previous_y[hit] + motion_y[hit] * time_of_impact
+            self.angle[hit_cars] = previous_angle[hit] + turn[hit] * time_of_impact
+
+        return collided
+
+    def detect_stagnation(self, indices: np.ndarray) -> np.ndarray:
+        """
+            Counts the steps each car went without getting `stagnation_distance` further along the track, or
+            away from where it last did when there is no centerline, which catches cars stopped or circling in place.
+
+            Args:
+                indices (np.ndarray): The cars that just moved
+
+            Returns: (np.ndarray) A boolean array, True where the car has been stagnating for `stagnation_steps`
+        """
+
+        if self.progress is not None:
+            moved_on = self.progress.best[indices] - self.anchor[2, indices] >= self.stagnation_distance
+        else:
+            moved_on = np.hypot(self.x[indices] - self.anchor[0, indices],
+                                self.y[indices] - self.anchor[1, indices]) >= self.stagnation_distance
+
+        moving = indices[moved_on]
+        self.anchor[0, moving] = self.x[moving]
+        self.anchor[1, moving] = self.y[moving]
+        if self.progress is not None:
+            self.anchor[2, moving] = self.progress.best[moving]
+
+        self.idle_steps[indices] = np.where(moved_on, 0, self.idle_steps[indices] + 1)
+
+        return self.idle_steps[indices] >= self.stagnation_steps
+
+    def observe(self, indices: np.ndarray = None) -> np.ndarray:
+        """
+            Reads the speed, sensor distances and points of the given cars, the others keep their last reading.
+
+            Args:
+                indices (np.ndarray): The cars to read, defaults to every live car
+
+            Returns: (np.ndarray) A (size, number_of_sensors + 2) array of speed, sensors and points
+        """
+
+        live = self.active if indices is None else indices
+        self.observations[live, 0] = self.speed[live]
+        self.observations[live, 1:-1] = self.sensors_distance(live)
+        self.observations[live, -1] = self.points[live]
+
+        return self.observations.copy()
+
+    def interpolated_pose(self, alpha: float) -> tuple:
+        """
+            Vectorised `Car.interpolated_pose` for every car.
+
+            Returns: (tuple) The x, y and angle arrays to draw the cars at
+        """
+
+        previous_x, previous_y, previous_angle = self.previous_pose
+
+        return (previous_x + (self.x - previous_x) * alpha,
+                previous_y + (self.y - previous_y) * alpha,
+                previous_angle + (self.angle - previous_angle) * alpha)
+
+    def update(self, indices: np.ndarray, throttle: np.ndarray, steering: np.ndarray) -> np.ndarray:
+        """
+            Applies the `Car.update` kinematics to the given cars.
+
+            Args:
+                indices (np.ndarray): The cars to move
+                throttle (np.ndarray): 1 to accelerate, -1 to brake or reverse, 0 to coast, per car
+                steering (np.ndarray): -1 to turn left, 1 to turn right, 0 to keep the heading, per car
+
+            Returns: (np.ndarray) The points gained by each car
+        """
+
+        self.previous_pose[:, indices] = self.x[indices], self.y[indices], self.angle[indices]
+
+        speed = self.speed[indices]
+        accelerating = throttle > 0
+        braking = throttle < 0
+        coasting = ~accelerating & ~braking
+
+        speed = np.where(accelerating, np.minimum(
+            speed + self.acceleration, self.top_speed), speed)
+        speed = np.where(braking, np.maximum(
+            speed - self.acceleration, -self.top_speed), speed)
+        speed = np.where(coasting & (speed > 0), np.maximum(
+            speed - self.deceleration, 0), speed)
+        speed = np.where(coasting & (speed < 0), np.minimum(
+            speed + self.deceleration, 0), speed)
+
+        points_gained = np.sign(throttle)
+        self.points[indices] += points_gained
+        self.angle[indices] += np.sign(steering) * self.turning_radius
+
+        radians = np.radians(self.angle[indices])
+        self.x[indices] += speed * np.cos(radians)
+        self.y[indices] += speed * np.sin(radians)
+        self.speed[indices] = speed
+
+        return points_gained
+
+    def step(self, actions) -> tuple:
+        """
+            Advances every live car by one physics step.
+
+            Args:
+                actions (np.ndarray): A (size, 2) array of throttle and steering, each in {-1, 0, 1}, only the rows
+                    of the live cars are read
+
+            Returns: (tuple) The observations, the rewards and the done flags of all cars
+        """
+
+        actions = np.asarray(actions).reshape(self.size, 2)
+        live = self.active
+
+        with profiler.stage("physics"):
+            points_gained = self.update(live, actions[live, 0], actions[live, 1])
+
+        with profiler.stage("collision"):
+            crashed = live[self.detect_collisions(live)]
+        self.speed[crashed] = 0
+        self.alive[crashed] = False
+        self.crashed[crashed] = True
+
+        rewards = np.zeros(self.size, dtype=np.float32)
+        if self.progress is not None:
+            with profiler.stage("progress"):
+                gained = self.progress.update(live, self.x[live], self.y[live], self.angle[live])
+            rewards[live] = gained * constants.TRACK_PROGRESS_REWARD_FACTOR
+        else:
+            rewards[live] = points_gained * self.car_points_factor
+
+        if self.stagnation_steps:
+            culled = live[self.detect_stagnation(live) & self.alive[live]]
+            self.speed[culled] = 0
+            self.alive[culled] = False
+            self.culled[culled] = True
+
+        with profiler.stage("sensors"):
+            observations = self.observe(live)
+
+        # Crashed and culled cars are dropped from the cars the next steps work on
+        self.active = live[self.alive[live]]
+
+        return observations, rewards, ~self.alive
@@ -0,0 +1,206 @@
+import numpy as np
+
+from src.utils import constants
+
+
+class TrackProgress:
+    def __init__(self, centerline: list, closed: bool = False, cell_size: float = constants.TRACK_PROGRESS_CELL_SIZE,
+                 dimensions: tuple = constants.SCREEN_DIMENSION) -> None:
+        """
+            Measures how far along the track a position is, as the arc length of the nearest point of the centerline.
+
+            The screen is split into a grid and every cell keeps the few centerline segments that can be nearest to
+            a point inside it: those no further from the cell centre than the nearest segment plus the cell diagonal.
+            A query only measures its cell's candidates, points off the grid measure every segment. Cells hold
+            fewer candidates when the segments are long next to the cells, as for a centerline from `preprocess_path`.
+
+            Args:
+                centerline (list): The drawn points of the track
+                closed (bool): The track is a loop, its last point joins back to the first, as `Tracks.expand_path`
+                    was told
+                cell_size (float): The side of a grid cell
+                dimensions (tuple(int, int)): The area covered by the grid, at least the screen
+
+            Returns:
+                None
+        """
+
+        points = np.array(centerline, dtype=np.float64).reshape(-1, 2)
+        if len(points) < 2:
+            raise ValueError("A centerline needs at least 2 points")
+
+        if closed and not np.array_equal(points[0], points[-1]):
+            points = np.vstack((points, points[:1]))
+
+        self.closed = closed
+        self.starts = points[:-1]
+        self.vectors = points[1:] - points[:-1]
+        self.lengths = np.hypot(self.vectors[:, 0], self.vectors[:, 1])
+        self.squared_lengths = np.maximum(self.lengths ** 2, 1e-12)
+        self.cumulative = np.concatenate(([0.0], np.cumsum(self.lengths)))
+        self.total_length = float(self.cumulative[-1])
+        self.directions = self.vectors / np.maximum(self.lengths, 1e-12)[:, None]
+
+        # Grid over the screen and the centerline
+        self.cell_size = cell_size
+        self.origin = np.minimum(points.min(axis=0), 0)
+        extent = np.maximum(points.max(axis=0), dimensions) - self.origin
+        self.columns, self.rows = (np.floor(extent / cell_size).astype(int) + 1).tolist()
+
+        column_centres = self.origin[0] + (np.arange(self.columns) + 0.5) * cell_size
+        row_centres = self.origin[1] + (np.arange(self.rows) + 0.5) * cell_size
+        centres_x, centres_y = np.meshgrid(column_centres, row_centres, indexing="xy")
+        centres_x, centres_y = centres_x.ravel(), centres_y.ravel()
+
+        all_segments = np.arange(len(self.starts))
+        within = np.empty((len(centres_x), len(self.starts)), dtype=bool)
+        for start in range(0, len(centres_x), 256):
+            rows = slice(start, start + 256)
+            distances = self._distances(centres_x[rows, None], centres_y[rows, None], all_segments)[0]
+            within[rows] = distances <= distances.min(axis=1, keepdims=True) + cell_size * np.sqrt(2)
+
+        # Candidate segments of every cell, cell by cell
+        cells, segments = np.nonzero(within)
+        self.counts = np.bincount(cells, minlength=len(within))
+        self.offsets = np.concatenate(([0], np.cumsum(self.counts)[:-1]))
+        self.candidates = segments
+
+    def _distances(self, xs: np.ndarray, ys: np.ndarray, segments: np.ndarray) -> tuple:
+        # Distance from each point to each of its candidate segments, and where along the segment it is nearest
+        offset_x = xs - self.starts[segments, 0]
+        offset_y = ys - self.starts[segments, 1]
+        along = np.clip((offset_x * self.vectors[segments, 0] + offset_y * self.vectors[segments, 1])
+                        / self.squared_lengths[segments], 0, 1)
+
+        distances = np.hypot(offset_x - along * self.vectors[segments, 0],
+                             offset_y - along * self.vectors[segments, 1])
+
+        return distances, along
+
+    def project(self, xs, ys) -> tuple:
+        """
+            Finds the nearest point of the centerline to many positions at once.
+
+            Args:
+                xs (np.ndarray): X co-ordinates of the positions, shape (P,)
+                ys (np.ndarray): Y co-ordinates of the positions, shape (P,)
+
+            Returns: (tuple) The arc length of the nearest centerline point, the distance to it and the index of
+                     its centerline segment, each of shape (P,)
+        """
+
+        xs = np.atleast_1d(np.asarray(xs, dtype=np.float64))
+        ys = np.atleast_1d(np.asarray(ys, dtype=np.float64))
+
+        columns = np.floor((xs - self.origin[0]) / self.cell_size).astype(np.int64)
+        rows = np.floor((ys - self.origin[1]) / self.cell_size).astype(np.int64)
+        on_grid = (columns >= 0) & (columns < self.columns) & (rows >= 0) & (rows < self.rows)
+
+        arc = np.empty(len(xs))
+        distance = np.empty(len(xs))
+        segment = np.empty(len(xs), dtype=np.int64)
+
+        for points, candidates in ((np.flatnonzero(on_grid), None), (np.flatnonzero(~on_grid), np.arange(len(self.starts)))):
+            if not len(points):
+                continue
+
+            if candidates is None:
+                # Pad every cell to the longest candidate list queried by repeating its last candidate
+                cells = rows[points] * self.columns + columns[points]
+                counts = self.counts[cells]
+                slots = np.minimum(np.arange(counts.max()), counts[:, None] - 1)
+                candidates = self.candidates[self.offsets[cells, None] + slots]
+            else:
+                candidates = np.broadcast_to(candidates, (len(points), len(candidates)))
+
+            distances, along = self._distances(xs[points, None], ys[points, None], candidates)
+            nearest = np.argmin(distances, axis=1)
+            picked = np.arange(len(points))
+
+            segment[points] = candidates[picked, nearest]
+            distance[points] = distances[picked, nearest]
+            arc[points] = self.cumulative[segment[points]] + along[picked, nearest] * self.lengths[segment[points]]
+
+        return arc, distance, segment
+
+
+class ProgressTracker:
+    def __init__(self, progress: TrackProgress, size: int, checkpoints: int = constants.TRACK_PROGRESS_CHECKPOINTS) -> None:
+        """
+            Follows the progress of many cars along the track from step to step.
+
+            The arc length moved each step is accumulated into `distance`, which keeps growing lap after lap on a
+            closed track and goes down when a car drives backwards. `best` is the furthest a car ever got, so going
+            back and forth earns nothing. The track is split into `checkpoints` equal parts and `checkpoints_passed`
+            counts the parts a car completed, lap after lap, and `laps` the whole laps.
+
+            Args:
+                progress (TrackProgress): The centerline of the track
+                size (int): The number of cars
+                checkpoints (int): The number of checkpoints per lap
+
+            Returns:
+                None
+        """
+
+        self.progress = progress
+        self.size = size
+        self.checkpoint_length = progress.total_length / max(1, checkpoints)
+
+        self.arc = np.zeros(size)
+        self.distance = np.zeros(size)
+        self.best = np.zeros(size)
+        self.laps = np.zeros(size, dtype=np.int64)
+        self.checkpoints_passed = np.zeros(size, dtype=np.int64)
+        self.wrong_way = np.zeros(size, dtype=bool)
+
+    def reset(self, xs: np.ndarray, ys: np.ndarray, indices: np.ndarray = None) -> None:
+        """
+            Starts measuring the given cars, every car by default, from their current positions.
+        """
+
+        indices = np.arange(self.size) if indices is None else indices
+
+        self.arc[indices] = self.progress.project(xs, ys)[0]
+        self.distance[indices] = 0
+        self.best[indices] = 0
+        self.laps[indices] = 0
+        self.checkpoints_passed[indices] = 0
+        self.wrong_way[indices] = False
+
+    def update(self, indices: np.ndarray, xs: np.ndarray, ys: np.ndarray, angles: np.ndarray) -> np.ndarray:
+        """
+            Moves the given cars to their new positions.
+
+            Args:
+                indices (np.ndarray): The cars that moved
+                xs (np.ndarray): Their new x co-ordinates
+                ys (np.ndarray): Their new y co-ordinates
+                angles (np.ndarray): Their headings in degrees, a car heading against the track is going the wrong way
+
+            Returns: (np.ndarray) How much further than ever before each car got, never negative
+        """
+
+        arc, _, segment = self.progress.project(xs, ys)
+        moved = arc - self.arc[indices]
+
+        if self.progress.closed:
+            # Crossing the start line jumps the arc length by about a lap
+            half_lap = self.progress.total_length / 2
+            moved[moved < -half_lap] += self.progress.total_length
+            moved[moved > half_lap] -= self.progress.total_length
+
+        self.arc[indices] = arc
+        self.distance[indices] += moved
+
+        gained = np.maximum(self.distance[indices] - self.best[indices], 0)
+        self.best[indices] += gained
+        self.checkpoints_passed[indices] = (self.best[indices] // self.checkpoint_length).astype(np.int64)
+        if self.progress.closed:
+            self.laps[indices] = (self.best[indices] // self.progress.total_length).astype(np.int64)
+
+        radians = np.radians(angles)
+        direction = self.progress.directions[segment]
+        self.wrong_way[indices] = np.cos(radians) * direction[:, 0] + np.sin(radians) * direction[:, 1] < 0
+
+        return gained
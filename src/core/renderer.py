@@ -0,0 +1,107 @@
+import pygame
+
+from src.utils import constants
+from src.core.tracks import Tracks
+
+tracks = Tracks()
+
+
+class Renderer:
+    def __init__(self, screen, inner_points: list, outer_points: list, car_body, angle_step: int = constants.CAR_SPRITE_ANGLE_STEP) -> None:
+        """
+            Draws the final screen by only touching the parts of it that changed since the last frame.
+
+            The track is drawn once to a cached layer. Each frame, the areas drawn on during the previous
+            frame are restored from that layer, the cars are blitted from a cache of pre-rotated sprites
+            and only the changed rectangles are sent to the display.
+
+            Args:
+                screen (pygame.display): The screen to draw on
+                inner_points (list): The list of inner points of the track
+                outer_points (list): The list of outer points of the track
+                car_body (pygame.image): The car image, facing an angle of 0
+                angle_step (int): The car sprites are cached every `angle_step` degrees
+
+            Returns:
+                None
+        """
+
+        self.screen = screen
+        self.car_body = car_body
+        self.angle_step = angle_step
+        self.sprites = {}
+
+        self.track_layer = pygame.Surface(screen.get_size()).convert()
+        self.previous_rects = []
+        self.rects = []
+        self.redraw_track(inner_points, outer_points)
+
+    def redraw_track(self, inner_points: list, outer_points: list) -> None:
+        """
+            Draws the track to the cached layer again, for when the track geometry changes.
+        """
+
+        self.track_layer.fill(constants.BLACK_COLOR)
+        tracks.draw_paths(self.track_layer, inner_points, outer_points)
+        self.screen.blit(self.track_layer, (0, 0))
+        self.rects.append(self.screen.get_rect())
+
+    def sprite(self, angle: float) -> pygame.Surface:
+        """
+            Returns the car sprite rotated to the nearest cached angle.
+        """
+
+        key = round(angle / self.angle_step) % (360 // self.angle_step)
+
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = pygame.transform.rotate(
+                self.car_body, -key * self.angle_step)
+
+        return sprite
+
+    def begin_frame(self) -> None:
+        """
+            Restores the track under everything drawn during the previous frame.
+        """
+
+        for rect in self.previous_rects:
+            self.screen.blit(self.track_layer, rect, rect)
+
+    def add_dirty(self, rect) -> None:
+        """
+            Marks an area drawn on outside the renderer, such as text, so it is updated and cleared next frame.
+        """
+
+        if rect is not None:
+            self.rects.append(pygame.Rect(rect))
+
+    def sensor_rect(self, x: float, y: float, max_distance: float = constants.SENSOR_MAX_DISTANCE) -> pygame.Rect:
+        """
+            Returns the area the sensor lines of a car at (x, y), with rays `max_distance` long, can be drawn on.
+        """
+
+        reach = max_distance + constants.DIRTY_RECT_MARGIN
+        return pygame.Rect(int(x - reach), int(y - reach), 2 * reach, 2 * reach)
+
+    def draw_car(self, x: float, y: float, angle: float) -> pygame.Rect:
+        """
+            Draws one car centred on (x, y).
+
+            Returns:
+                pygame.Rect: The area of the screen the car was drawn on
+        """
+
+        sprite = self.sprite(angle)
+        rect = self.screen.blit(sprite, sprite.get_rect(center=(x, y)))
+        self.rects.append(rect)
+
+        return rect
+
+    def end_frame(self) -> None:
+        """
+            Sends the areas changed this frame, and the ones cleared from the previous frame, to the display.
+        """
+
+        pygame.display.update(self.previous_rects + self.rects)
+        self.previous_rects, self.rects = self.rects, []
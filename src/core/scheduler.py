@@ -0,0 +1,130 @@
+import time
+
+from src.utils import constants
+
+
+class FixedTimestep:
+    def __init__(
+        self,
+        steps_per_second: int = constants.PHYSICS_STEPS_PER_SECOND,
+        speed: float = constants.SIMULATION_SPEED,
+        frame_rate: int = constants.FPS,
+        max_steps: int = constants.SIMULATION_MAX_STEPS_PER_FRAME,
+        clock=time.perf_counter,
+    ) -> None:
+        """
+            Decides how many fixed physics steps to run for each rendered frame.
+
+            Real time elapsed since the last frame, scaled by `speed`, is added to an accumulator that is
+            spent in steps of exactly 1 / `steps_per_second` simulated seconds, so the vehicle dynamics do
+            not depend on the frame rate. What is left over gives `alpha`, the fraction of a step the
+            renderer should interpolate between the previous and the current pose.
+
+            In unbounded mode, time is ignored and every frame runs as many steps as fit in one frame
+            period at the measured cost of a step.
+
+            Args:
+                steps_per_second (int): The physics rate in simulated time
+                speed (float): The real time multiplier, 2.0 simulates two seconds per second
+                frame_rate (int): The rendered frames per second, the time budget of an unbounded frame
+                max_steps (int): The most steps run in one frame, a slow frame drops the time it cannot catch up on
+                clock (callable): Returns the current time in seconds
+
+            Returns:
+                None
+        """
+
+        self.step_time = 1 / steps_per_second
+        self.speed = speed
+        self.frame_time = 1 / frame_rate
+        self.max_steps = max_steps
+        self.clock = clock
+
+        self.unbounded = False
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self.cost = self.step_time / 1000
+        self.last_time = None
+
+    def set_speed(self, speed: float) -> None:
+        """
+            Changes the real time multiplier, keeping the time already accumulated.
+        """
+
+        self.speed = speed
+        self.unbounded = False
+
+    def faster(self) -> None:
+        """
+            Moves to the next speed of `SIMULATION_SPEEDS`.
+        """
+
+        self.set_speed(min((speed for speed in constants.SIMULATION_SPEEDS if speed > self.speed),
+                           default=self.speed))
+
+    def slower(self) -> None:
+        """
+            Moves to the previous speed of `SIMULATION_SPEEDS`.
+        """
+
+        self.set_speed(max((speed for speed in constants.SIMULATION_SPEEDS if speed < self.speed),
+                           default=self.speed))
+
+    def toggle_unbounded(self) -> None:
+        """
+            Switches between running at `speed` and running as fast as possible.
+        """
+
+        self.unbounded = not self.unbounded
+        self.accumulator = 0.0
+        self.last_time = None
+
+    def steps(self) -> int:
+        """
+            Consumes the time elapsed since the previous call and returns the number of steps to run now.
+        """
+
+        now = self.clock()
+        elapsed = 0.0 if self.last_time is None else now - self.last_time
+        self.last_time = now
+
+        if self.unbounded:
+            self.alpha = 1.0
+            return max(1, min(int(self.frame_time / self.cost), self.max_steps))
+
+        self.accumulator += elapsed * self.speed
+        steps = int(self.accumulator / self.step_time)
+
+        if steps > self.max_steps:
+            steps = self.max_steps
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * self.step_time
+
+        self.alpha = self.accumulator / self.step_time
+
+        return steps
+
+    def run(self, step) -> int:
+        """
+            Runs this frame's physics steps.
+
+            Args:
+                step (callable): Advances the simulation by one step, called with True on the last step of the frame
+
+            Returns:
+                int: The number of steps run
+        """
+
+        steps = self.steps()
+        if not steps:
+            return 0
+
+        start = self.clock()
+        for i in range(steps):
+            step(i == steps - 1)
+
+        # Smoothed cost of one step, sizes the unbounded frames
+        self.cost = 0.9 * self.cost + 0.1 * max((self.clock() - start) / steps, 1e-7)
+
+        return steps
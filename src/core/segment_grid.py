@@ -0,0 +1,93 @@
+import numpy as np
+
+from src.utils import constants
+
+
+def _ragged_range(counts: np.ndarray) -> tuple:
+    # For rows of the given lengths laid end to end, the row of every element and its position within the row
+    owners = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+
+    return owners, np.arange(len(owners)) - starts[owners]
+
+
+class SegmentGrid:
+    def __init__(self, segments: np.ndarray, cell_size: float = constants.TRACK_INDEX_CELL_SIZE) -> None:
+        """
+            A fixed uniform grid over segments, for many queries at once against a track that never changes.
+
+            Every segment is listed in the cells its bounding box overlaps, and the lists of all the cells are
+            stored end to end in one array. Unlike `TrackIndex` nothing can be erased, so queries are plain
+            array lookups.
+
+            Args:
+                segments (np.ndarray): An (N, 4) array of segments as returned by `Paths.boundary_segments`
+                cell_size (float): The side length of a grid cell in pixels
+
+            Returns:
+                None
+        """
+
+        self.segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+        self.cell_size = cell_size
+
+        x_min = np.minimum(self.segments[:, 0], self.segments[:, 2])
+        x_max = np.maximum(self.segments[:, 0], self.segments[:, 2])
+        y_min = np.minimum(self.segments[:, 1], self.segments[:, 3])
+        y_max = np.maximum(self.segments[:, 1], self.segments[:, 3])
+
+        self.origin = np.array([x_min.min(initial=0), y_min.min(initial=0)])
+        self.columns = int((x_max.max(initial=0) - self.origin[0]) // cell_size) + 1
+        self.rows = int((y_max.max(initial=0) - self.origin[1]) // cell_size) + 1
+
+        first_column, last_column, first_row, last_row = self._cell_ranges(x_min, y_min, x_max, y_max)
+        segment, cells = self._cells(first_column, last_column, first_row, last_row)
+
+        # Segments of every cell, cell by cell
+        self.counts = np.bincount(cells, minlength=self.columns * self.rows)
+        self.offsets = np.cumsum(self.counts) - self.counts
+        self.candidates = segment[np.argsort(cells, kind="stable")]
+
+    def _cell_ranges(self, x_min, y_min, x_max, y_max) -> tuple:
+        # First and last column and row covered by each box, clipped to the grid
+        first_column = np.maximum(np.floor((x_min - self.origin[0]) / self.cell_size), 0).astype(np.int64)
+        last_column = np.minimum(np.floor((x_max - self.origin[0]) / self.cell_size), self.columns - 1).astype(np.int64)
+        first_row = np.maximum(np.floor((y_min - self.origin[1]) / self.cell_size), 0).astype(np.int64)
+        last_row = np.minimum(np.floor((y_max - self.origin[1]) / self.cell_size), self.rows - 1).astype(np.int64)
+
+        return first_column, last_column, first_row, last_row
+
+    def _cells(self, first_column, last_column, first_row, last_row) -> tuple:
+        # Every (box, cell) pair of boxes given by their cell ranges, boxes off the grid have none
+        widths = np.maximum(last_column - first_column + 1, 0)
+        heights = np.maximum(last_row - first_row + 1, 0)
+
+        boxes, position = _ragged_range(widths * heights)
+        columns = first_column[boxes] + position % widths[boxes]
+        rows = first_row[boxes] + position // widths[boxes]
+
+        return boxes, rows * self.columns + columns
+
+    def candidates_in_boxes(self, x_min, y_min, x_max, y_max) -> tuple:
+        """
+            Finds the segments that may touch each of many axis aligned boxes.
+
+            Every segment whose bounding box overlaps a box is listed, some more than once, along with segments
+            that share its cells without reaching it.
+
+            Args:
+                x_min (np.ndarray): Left sides of the boxes, shape (C,)
+                y_min (np.ndarray): Top sides of the boxes, shape (C,)
+                x_max (np.ndarray): Right sides of the boxes, shape (C,)
+                y_max (np.ndarray): Bottom sides of the boxes, shape (C,)
+
+            Returns: (tuple) The box and the segment index of every candidate pair, sorted by box
+        """
+
+        boxes, cells = self._cells(*self._cell_ranges(
+            np.asarray(x_min, dtype=np.float64), np.asarray(y_min, dtype=np.float64),
+            np.asarray(x_max, dtype=np.float64), np.asarray(y_max, dtype=np.float64)))
+
+        pairs, position = _ragged_range(self.counts[cells])
+
+        return boxes[pairs], self.candidates[self.offsets[cells][pairs] + position]
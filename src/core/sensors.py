@@ -0,0 +1,71 @@
+import numpy as np
+
+from src.utils import constants
+
+
+class SensorArray:
+    def __init__(self, number_of_sensors: int = 3, spread: float = None, max_distance: float = constants.SENSOR_MAX_DISTANCE) -> None:
+        """
+            A fan of distance sensors with their directions worked out once, relative to the car heading.
+
+            With no spread given, 3 and 5 sensors keep the angles of `SENSOR_DIRECTIONS`. Any other count is spread
+            evenly over `SENSOR_SPREAD` degrees centred on the heading. Each step only the heading is rotated, the
+            unit directions of the rays come from the precomputed table.
+
+            Args:
+                number_of_sensors (int): The number of rays
+                spread (float): The angle in degrees between the outermost rays
+                max_distance (float): The range of the rays
+
+            Returns:
+                None
+        """
+
+        if number_of_sensors < 1:
+            raise ValueError(f"Invalid number of sensors: {number_of_sensors}")
+
+        if spread is None and number_of_sensors in constants.SENSOR_DIRECTIONS:
+            offsets = constants.SENSOR_DIRECTIONS[number_of_sensors]
+        elif number_of_sensors == 1:
+            offsets = [0]
+        else:
+            spread = constants.SENSOR_SPREAD if spread is None else spread
+            offsets = np.linspace(-spread / 2, spread / 2, number_of_sensors)
+
+        self.number_of_sensors = number_of_sensors
+        self.max_distance = max_distance
+        self.offsets = np.asarray(offsets, dtype=np.float64)
+
+        radians = np.radians(self.offsets)
+        self.cos = np.cos(radians)
+        self.sin = np.sin(radians)
+
+    def directions(self, angle) -> tuple:
+        """
+            Rotates the direction table to the heading of one or many cars.
+
+            Args:
+                angle (float or np.ndarray): The car heading in degrees, or an array of shape (C,)
+
+            Returns: (tuple) The x and y components of the ray directions, shape (R,) or (C, R)
+        """
+
+        radians = np.radians(angle)
+        heading_cos = np.cos(radians)
+        heading_sin = np.sin(radians)
+
+        if np.ndim(angle):
+            heading_cos = heading_cos[:, None]
+            heading_sin = heading_sin[:, None]
+
+        return (heading_cos * self.cos - heading_sin * self.sin,
+                heading_sin * self.cos + heading_cos * self.sin)
+
+    def hit_points(self, x: float, y: float, angle: float, distances: np.ndarray) -> tuple:
+        """
+            Returns: (tuple) The x and y co-ordinates where the rays of one car stopped
+        """
+
+        direction_x, direction_y = self.directions(angle)
+
+        return x + distances * direction_x, y + distances * direction_y
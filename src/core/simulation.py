@@ -0,0 +1,85 @@
+import numpy as np
+
+from src.utils import constants
+from src.core.population import Population
+from src.core.progress import TrackProgress
+
+
+class Simulation:
+    def __init__(
+        self,
+        inner_points: list,
+        outer_points: list,
+        number_of_cars: int = 1,
+        number_of_sensors: int = 3,
+        dimensions: tuple = constants.CAR_DIMENSIONS,
+        start: tuple = None,
+        progress: TrackProgress = None,
+        stagnation_steps: int = 0,
+    ) -> None:
+        """
+            Creates a headless simulation that steps cars on a track with no display, event pump or frame cap.
+
+            Args:
+                inner_points (list): The list of inner points of the track
+                outer_points (list): The list of outer points of the track
+                number_of_cars (int): The number of cars driving on the track
+                number_of_sensors (int): The number of sensors attached to each car
+                dimensions (tuple(float, float)): The dimensions of each car
+                start (tuple(float, float)): The starting point of the cars, defaults to the start of the track
+                progress (TrackProgress): The centerline of the track, rewards progress along it when given
+                stagnation_steps (int): The steps a car may go without getting anywhere before it is culled, 0 never
+                    culls a car
+
+            Returns:
+                None
+        """
+
+        self.inner_points = inner_points
+        self.outer_points = outer_points
+        self.population = Population(
+            inner_points,
+            outer_points,
+            size=number_of_cars,
+            number_of_sensors=number_of_sensors,
+            dimensions=dimensions,
+            start=start,
+            progress=progress,
+            stagnation_steps=stagnation_steps,
+        )
+        self.start = self.population.start
+        self.number_of_sensors = number_of_sensors
+
+    @property
+    def dones(self) -> np.ndarray:
+        return ~self.population.alive
+
+    def reset(self) -> np.ndarray:
+        """
+            Puts every car back at the start of the track.
+
+            Returns: (np.ndarray) The observations of all cars
+        """
+
+        return self.population.reset()
+
+    def observe(self) -> np.ndarray:
+        """
+            Reads the speed, sensor distances and points of every car.
+
+            Returns: (np.ndarray) A (number_of_cars, number_of_sensors + 2) array of speed, sensors and points
+        """
+
+        return self.population.observe()
+
+    def step(self, actions) -> tuple:
+        """
+            Advances every car that has not crashed by one physics step.
+
+            Args:
+                actions (np.ndarray): A (number_of_cars, 2) array of throttle and steering, each in {-1, 0, 1}
+
+            Returns: (tuple) The observations, the rewards and the done flags of all cars
+        """
+
+        return self.population.step(actions)
@@ -0,0 +1,304 @@
+import math
+
+from collections import defaultdict
+from typing import NamedTuple
+
+import numpy as np
+
+from src.utils import constants
+from src.core.paths import Paths
+from src.core.compiled_track import CompiledTrack
+from src.core.track_mask import TrackMask
+
+paths = Paths()
+
+INNER = 0
+OUTER = 1
+
+
+class Erasure(NamedTuple):
+    # (boundary, start, stop) slices to delete from the point lists, in the order given
+    slices: list
+    # (x_min, y_min, x_max, y_max) of the part of the track that changed, None when nothing was erased
+    box: tuple
+
+
+class TrackIndex:
+    def __init__(self, inner_points: list, outer_points: list, cell_size: float = constants.TRACK_INDEX_CELL_SIZE) -> None:
+        """
+            Builds a uniform grid over the boundary segments of the track so queries only touch nearby segments.
+
+            Each boundary is kept as a circular linked list of vertices, so erasing a vertex only
+            unregisters its two segments and registers the one that joins its neighbours.
+
+            Args:
+                inner_points (list): The list of inner points of the track
+                outer_points (list): The list of outer points of the track
+                cell_size (float): The side length of a grid cell in pixels
+
+            Returns:
+                None
+        """
+
+        self.cell_size = cell_size
+        self.cells = defaultdict(set)
+        self.version = 0
+        self._compiled = None
+        self._compiled_version = None
+        self._mask = None
+        self._mask_version = None
+
+        self.xs = []
+        self.ys = []
+        self.next = []
+        self.prev = []
+        self.alive = []
+        self.head = []
+        self.count = []
+        # Fenwick trees over the alive flags, to find where a vertex sits in the point lists
+        self.ranks = []
+
+        for boundary, points in enumerate((inner_points, outer_points)):
+            count = len(points)
+            self.xs.append([float(p[0]) for p in points])
+            self.ys.append([float(p[1]) for p in points])
+            self.next.append([(i + 1) % count for i in range(count)])
+            self.prev.append([(i - 1) % count for i in range(count)])
+            self.alive.append([True] * count)
+            self.head.append(0)
+            self.count.append(count)
+            self.ranks.append([i & -i for i in range(count + 1)])
+
+            if count >= 2:
+                for vertex in range(count):
+                    self._register(boundary, vertex)
+
+    def _cell(self, value: float) -> int:
+        return math.floor(value / self.cell_size)
+
+    def _segment_cells(self, x1: float, y1: float, x2: float, y2: float):
+        """
+            Yields every grid cell the segment passes through, one column at a time.
+        """
+
+        if x1 > x2:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+
+        slope = (y2 - y1) / (x2 - x1) if x2 != x1 else 0.0
+
+        for column in range(self._cell(x1), self._cell(x2) + 1):
+            if x2 == x1:
+                y_start, y_end = y1, y2
+            else:
+                left = max(x1, column * self.cell_size)
+                right = min(x2, (column + 1) * self.cell_size)
+                y_start = y1 + (left - x1) * slope
+                y_end = y1 + (right - x1) * slope
+
+            for row in range(self._cell(min(y_start, y_end)), self._cell(max(y_start, y_end)) + 1):
+                yield column, row
+
+    def _segment(self, boundary: int, vertex: int) -> tuple:
+        end = self.next[boundary][vertex]
+        return (self.xs[boundary][vertex], self.ys[boundary][vertex],
+                self.xs[boundary][end], self.ys[boundary][end])
+
+    def _register(self, boundary: int, vertex: int) -> None:
+        key = (boundary, vertex)
+        for cell in self._segment_cells(*self._segment(boundary, vertex)):
+            self.cells[cell].add(key)
+
+    def _unregister(self, boundary: int, vertex: int) -> None:
+        key = (boundary, vertex)
+        for cell in self._segment_cells(*self._segment(boundary, vertex)):
+            bucket = self.cells.get(cell)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.cells[cell]
+
+    def _is_closing(self, boundary: int, vertex: int) -> bool:
+        return self.next[boundary][vertex] == self.head[boundary]
+
+    def keys_in_box(self, x_min: float, y_min: float, x_max: float, y_max: float, closed: bool = True) -> set:
+        """
+            Collects the segments registered in the cells overlapping the given box.
+
+            Args:
+                x_min, y_min, x_max, y_max (float): The box to query
+                closed (bool): Include the segments that close each boundary back to its first point
+
+            Returns: (set) The (boundary, vertex) keys of the candidate segments
+        """
+
+        keys = set()
+        for column in range(self._cell(x_min), self._cell(x_max) + 1):
+            for row in range(self._cell(y_min), self._cell(y_max) + 1):
+                bucket = self.cells.get((column, row))
+                if bucket:
+                    keys |= bucket
+
+        if not closed:
+            keys = {key for key in keys if not self._is_closing(*key)}
+
+        return keys
+
+    def segments_in_box(self, x_min: float, y_min: float, x_max: float, y_max: float, closed: bool = True) -> np.ndarray:
+        """
+            Returns the candidate segments near the given box as an (N, 4) array of x1, y1, x2, y2.
+        """
+
+        keys = self.keys_in_box(x_min, y_min, x_max, y_max, closed)
+        if not keys:
+            return np.empty((0, 4), dtype=np.float64)
+
+        return np.array([self._segment(*key) for key in keys], dtype=np.float64)
+
+    def compiled(self) -> CompiledTrack:
+        """
+            Returns the compiled polygons of the track, rebuilt only when the track has been erased since the last call.
+        """
+
+        if self._compiled_version != self.version:
+            self._compiled = CompiledTrack(self.points(INNER), self.points(OUTER))
+            self._compiled_version = self.version
+
+        return self._compiled
+
+    def mask(self) -> TrackMask:
+        """
+            Returns the rasterized drivable area of the track, rebuilt only when the track has been erased since the last call.
+        """
+
+        if self._mask_version != self.version:
+            self._mask = TrackMask(self.compiled())
+            self._mask_version = self.version
+
+        return self._mask
+
+    def is_point_within_track(self, x: float, y: float) -> bool:
+        """
+            Check if a point is within the track boundaries, same as `Paths.is_point_within_track`.
+        """
+
+        return self.compiled().is_point_within_track(x, y)
+
+    def cast_directions(self, x: float, y: float, direction_x, direction_y, max_distance: float) -> np.ndarray:
+        """
+            Casts rays from a point against only the segments within reach of the rays.
+
+            Args:
+                x (float): X co-ordinate of the ray origin
+                y (float): Y co-ordinate of the ray origin
+                direction_x (np.ndarray): X components of the ray directions
+                direction_y (np.ndarray): Y components of the ray directions
+                max_distance (float): The range of the rays
+
+            Returns: (np.ndarray) The hit distance for each ray
+        """
+
+        segments = self.segments_in_box(
+            x - max_distance, y - max_distance, x + max_distance, y + max_distance)
+
+        return paths.cast_directions(x, y, direction_x, direction_y, segments, max_distance)
+
+    def erase(self, eraser_position: tuple, eraser_radius: float) -> Erasure:
+        """
+            Erase the vertices within the eraser radius and update the grid in place.
+
+            Only the vertices of the segments near the eraser are looked at. The returned slices remove the same
+            vertices from the inner and outer point lists in place, so the lists never need rebuilding.
+
+            Args:
+                eraser_position (tuple): A tuple of the current eraser position (x, y)
+                eraser_radius (float): The erasers radius
+
+            Returns: (Erasure) The list slices to delete and the box around the changed part of the track
+        """
+
+        ex, ey = eraser_position
+        candidates = set()
+        for boundary, vertex in self.keys_in_box(ex - eraser_radius, ey - eraser_radius,
+                                                 ex + eraser_radius, ey + eraser_radius):
+            candidates.add((boundary, vertex))
+            candidates.add((boundary, self.next[boundary][vertex]))
+
+        erased = [(boundary, vertex) for boundary, vertex in candidates
+                  if math.dist((self.xs[boundary][vertex], self.ys[boundary][vertex]), eraser_position) <= eraser_radius]
+
+        if not erased:
+            return Erasure([], None)
+
+        # The erased vertices and the neighbours that get joined bound the changed part of the track
+        touched = [(boundary, neighbour) for boundary, vertex in erased
+                   for neighbour in (self.prev[boundary][vertex], vertex, self.next[boundary][vertex])]
+        xs = [self.xs[boundary][vertex] for boundary, vertex in touched]
+        ys = [self.ys[boundary][vertex] for boundary, vertex in touched]
+        box = (min(xs), min(ys), max(xs), max(ys))
+
+        # Last vertex first, so each position is still valid once the ones after it are deleted
+        slices = []
+        for boundary, vertex in sorted(erased, key=lambda key: (key[0], -key[1])):
+            position = self._rank(boundary, vertex)
+            self._remove_vertex(boundary, vertex)
+
+            if slices and slices[-1][0] == boundary and slices[-1][1] == position + 1:
+                slices[-1] = (boundary, position, slices[-1][2])
+            else:
+                slices.append((boundary, position, position + 1))
+
+        self.version += 1
+
+        return Erasure(slices, box)
+
+    def _rank(self, boundary: int, vertex: int) -> int:
+        # Number of alive vertices before this one
+        tree = self.ranks[boundary]
+        rank = 0
+        while vertex > 0:
+            rank += tree[vertex]
+            vertex -= vertex & -vertex
+
+        return rank
+
+    def _remove_vertex(self, boundary: int, vertex: int) -> None:
+        previous = self.prev[boundary][vertex]
+        following = self.next[boundary][vertex]
+
+        if self.count[boundary] >= 2:
+            self._unregister(boundary, previous)
+            self._unregister(boundary, vertex)
+
+        self.next[boundary][previous] = following
+        self.prev[boundary][following] = previous
+        self.alive[boundary][vertex] = False
+        self.count[boundary] -= 1
+
+        tree = self.ranks[boundary]
+        position = vertex + 1
+        while position < len(tree):
+            tree[position] -= 1
+            position += position & -position
+
+        if self.head[boundary] == vertex:
+            self.head[boundary] = following
+
+        if self.count[boundary] >= 2:
+            self._register(boundary, previous)
+
+    def points(self, boundary: int) -> list:
+        """
+            Returns the remaining vertices of a boundary in drawing order.
+        """
+
+        if self.count[boundary] == 0:
+            return []
+
+        xs, ys, following = self.xs[boundary], self.ys[boundary], self.next[boundary]
+        vertex = self.head[boundary]
+        points = []
+        for _ in range(self.count[boundary]):
+            points.append((xs[vertex], ys[vertex]))
+            vertex = following[vertex]
+
+        return points
@@ -0,0 +1,94 @@
+import numpy as np
+
+from src.utils import constants
+from src.core.compiled_track import CompiledTrack
+
+
+class TrackMask:
+    def __init__(self, compiled_track: CompiledTrack, dimensions: tuple = constants.SCREEN_DIMENSION) -> None:
+        """
+            Rasterizes the drivable area of the track into a bit-packed mask, one bit per screen pixel.
+
+            Pixel (px, py) is drivable when the point (px, py) is within the track, so looking a point up
+            costs the same however many points the track was drawn with. The crossings of both boundaries
+            count towards one parity, so the area between them is drivable whichever one encloses the other.
+
+            Args:
+                compiled_track (CompiledTrack): The compiled polygons of the track
+                dimensions (tuple(int, int)): The width and height of the mask
+
+            Returns:
+                None
+        """
+
+        self.width, self.height = dimensions
+        columns = np.arange(self.width, dtype=np.float64)
+
+        drivable = np.zeros((self.height, self.width), dtype=bool)
+        for row in range(self.height):
+            inside_inner = self._parity(compiled_track.inner.crossings(row), columns)
+            inside_outer = self._parity(compiled_track.outer.crossings(row), columns)
+            drivable[row] = inside_inner ^ inside_outer
+
+        self.bits = np.packbits(drivable, axis=1)
+        self.footprints = {}
+
+    @staticmethod
+    def _parity(crossings: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        # Even-odd rule, count the crossings at or right of each column
+        right_of = len(crossings) - np.searchsorted(crossings, columns, side="left")
+        return right_of % 2 == 1
+
+    def is_drivable(self, xs, ys) -> np.ndarray:
+        """
+            Looks up whether points are on the track, points off the screen are never drivable.
+
+            Args:
+                xs (np.ndarray): X co-ordinates of the points
+                ys (np.ndarray): Y co-ordinates of the points
+
+            Returns: (np.ndarray) A boolean array, True where the point is on the track
+        """
+
+        columns = np.rint(xs).astype(np.int64)
+        rows = np.rint(ys).astype(np.int64)
+        on_screen = (columns >= 0) & (columns < self.width) & (
+            rows >= 0) & (rows < self.height)
+
+        columns = np.where(on_screen, columns, 0)
+        rows = np.where(on_screen, rows, 0)
+        bits = (self.bits[rows, columns >> 3] >> (7 - (columns & 7))) & 1
+
+        return on_screen & (bits == 1)
+
+    def boxes_collide(self, xs, ys, half_width: float, half_length: float) -> np.ndarray:
+        """
+            Checks the axis aligned boxes used by `Car.detect_collision` against the mask by indexing every pixel they cover.
+
+            Args:
+                xs (np.ndarray): X co-ordinates of the box centres, shape (C,)
+                ys (np.ndarray): Y co-ordinates of the box centres, shape (C,)
+                half_width (float): Half of the box size along x
+                half_length (float): Half of the box size along y
+
+            Returns: (np.ndarray) A boolean array of shape (C,), True where any part of the box is off the track
+        """
+
+        footprint = self.footprints.get((half_width, half_length))
+        if footprint is None:
+            offsets_x, offsets_y = np.meshgrid(
+                np.linspace(-half_width, half_width, int(np.ceil(2 * half_width)) + 1),
+                np.linspace(-half_length, half_length, int(np.ceil(2 * half_length)) + 1))
+            footprint = self.footprints[(half_width, half_length)] = (offsets_x.ravel(), offsets_y.ravel())
+
+        xs = np.asarray(xs, dtype=np.float64)[:, None] + footprint[0]
+        ys = np.asarray(ys, dtype=np.float64)[:, None] + footprint[1]
+
+        return ~self.is_drivable(xs, ys).all(axis=1)
+
+    def box_collides(self, x: float, y: float, half_width: float, half_length: float) -> bool:
+        """
+            Single box version of `boxes_collide`.
+        """
+
+        return bool(self.boxes_collide(np.array([x]), np.array([y]), half_width, half_length)[0])
@@ -0,0 +1,130 @@
+import os
+import struct
+
+from typing import NamedTuple
+
+import numpy as np
+
+from src.utils import constants
+
+# magic, format version, flags, centerline count, inner count, outer count, start x, start y
+HEADER = struct.Struct("<8sHHIII2f")
+MAGIC = b"SDCTRACK"
+VERSION = 1
+
+# Flags, files written before there were any have none set
+CLOSED = 1
+
+
+class TrackData(NamedTuple):
+    centerline: np.ndarray
+    inner_points: np.ndarray
+    outer_points: np.ndarray
+    start: tuple
+    closed: bool
+
+
+class TrackStore:
+    def __init__(self):
+        pass
+
+    def save(self, path: str, centerline: list, inner_points: list, outer_points: list, start: tuple = None,
+             closed: bool = False) -> None:
+        """
+            Writes a track as a small header followed by raw float32 (x, y) arrays.
+
+            The file is written next to its destination and renamed into place, so a reader never sees half a track.
+
+            Args:
+                path (str): The file to write
+                centerline (list): The drawn points of the track
+                inner_points (list): The list of inner points of the track
+                outer_points (list): The list of outer points of the track
+                start (tuple): The starting point of the cars, defaults to the start of the track
+                closed (bool): The centerline is a loop, as `Tracks.expand_path` was told
+
+            Returns: None
+        """
+
+        arrays = [np.asarray(points, dtype="<f4").reshape(-1, 2)
+                  for points in (centerline, inner_points, outer_points)]
+
+        if start is None:
+            start = ((inner_points[0][0] + outer_points[0][0]) / 2,
+                     (inner_points[0][1] + outer_points[0][1]) / 2)
+
+        header = HEADER.pack(MAGIC, VERSION, CLOSED if closed else 0, *(len(array) for array in arrays), *start)
+
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(header)
+            for array in arrays:
+                file.write(array.tobytes())
+        os.replace(temporary_path, path)
+
+    def load(self, path: str, mmap: bool = True) -> TrackData:
+        """
+            Reads a track written by `save`.
+
+            Args:
+                path (str): The file to read
+                mmap (bool): Map the arrays read-only from the file instead of copying them into memory
+
+            Returns: (TrackData) The centerline, inner points, outer points, start and closedness of the track
+        """
+
+        with open(path, "rb") as file:
+            magic, version, flags, *counts, start_x, start_y = HEADER.unpack(
+                file.read(HEADER.size))
+
+            if magic != MAGIC:
+                raise ValueError(f"Not a track file: {path}")
+            if version != VERSION:
+                raise ValueError(f"Unsupported track file version {version}: {path}")
+
+            if not mmap:
+                data = np.frombuffer(file.read(), dtype="<f4")
+
+        if mmap:
+            data = np.memmap(path, dtype="<f4", mode="r", offset=HEADER.size,
+                             shape=(2 * sum(counts),))
+
+        arrays = []
+        offset = 0
+        for count in counts:
+            arrays.append(data[offset:offset + 2 * count].reshape(count, 2))
+            offset += 2 * count
+
+        return TrackData(*arrays, (float(start_x), float(start_y)), bool(flags & CLOSED))
+
+
+class TrackLibrary:
+    def __init__(self, directory: str = constants.TRACKS_DIRECTORY) -> None:
+        """
+            A folder of track files, each mapped from disk only when it is first used.
+
+            Args:
+                directory (str): The folder holding the `.track` files
+
+            Returns:
+                None
+        """
+
+        self.store = TrackStore()
+        self.paths = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.endswith(constants.TRACK_FILE_EXTENSION))
+        self.tracks = {}
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __getitem__(self, index: int) -> TrackData:
+        if index not in self.tracks:
+            self.tracks[index] = self.store.load(self.paths[index])
+
+        return self.tracks[index]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
@@ -1,9 +1,12 @@
-import pygame
 import math
 
 import numpy as np
 
 from src.utils import constants
+from src.core.paths import Paths
+from src.core.segment_grid import SegmentGrid
+
+paths = Paths()
 
 
 class Tracks:
@@ -34,39 +37,368 @@ class Tracks:
         perp_y = dx / length * offset
         return (perp_x, perp_y)
 
-    def expand_path(self, points: list, thickness: int) -> tuple:
+    def smooth_path(self, points: list, window: int) -> list:
+        """
+            Smooth the drawn points with a moving average, keeping both end points in place.
+
+            Args:
+                points (list): List of points representing the track.
+                window (int): The number of neighbouring points averaged together.
+
+            Returns:
+                list: The smoothed points.
+        """
+
+        if window < 2 or len(points) <= window:
+            return list(points)
+
+        points = np.asarray(points, dtype=np.float64)
+        kernel = np.ones(window) / window
+        padded = np.pad(points, ((window // 2, window - 1 - window // 2), (0, 0)), mode="edge")
+        smoothed = np.column_stack([np.convolve(padded[:, axis], kernel, mode="valid") for axis in (0, 1)])
+        smoothed[0], smoothed[-1] = points[0], points[-1]
+
+        return [tuple(point) for point in smoothed.tolist()]
+
+    def resample_path(self, points: list, spacing: float) -> list:
+        """
+            Resample the points at an even arc-length spacing along the path.
+
+            Args:
+                points (list): List of points representing the track.
+                spacing (float): The distance between two consecutive resampled points.
+
+            Returns:
+                list: The resampled points, always including the first and last point.
+        """
+
+        if len(points) < 2 or spacing <= 0:
+            return list(points)
+
+        points = np.asarray(points, dtype=np.float64)
+        arc_length = np.concatenate(
+            ([0], np.cumsum(np.hypot(*np.diff(points, axis=0).T))))
+
+        if arc_length[-1] == 0:
+            return [tuple(points[0].tolist())]
+
+        samples = np.append(np.arange(0, arc_length[-1], spacing), arc_length[-1])
+        resampled = np.column_stack(
+            (np.interp(samples, arc_length, points[:, 0]), np.interp(samples, arc_length, points[:, 1])))
+
+        return [tuple(point) for point in resampled.tolist()]
+
+    def simplify_path(self, points: list, tolerance: float) -> list:
+        """
+            Drop the points that deviate less than the tolerance from the path, with Ramer-Douglas-Peucker.
+
+            Args:
+                points (list): List of points representing the track.
+                tolerance (float): The largest distance a dropped point may be from the simplified path.
+
+            Returns:
+                list: The points that are kept.
+        """
+
+        if len(points) < 3 or tolerance <= 0:
+            return list(points)
+
+        points = np.asarray(points, dtype=np.float64)
+        keep = np.zeros(len(points), dtype=bool)
+        keep[0] = keep[-1] = True
+        stack = [(0, len(points) - 1)]
+
+        while stack:
+            first, last = stack.pop()
+            if last - first < 2:
+                continue
+
+            start, end = points[first], points[last]
+            middle = points[first + 1:last]
+            dx, dy = end - start
+            length = np.hypot(dx, dy)
+
+            if length == 0:
+                distances = np.hypot(*(middle - start).T)
+            else:
+                distances = np.abs(dx * (middle[:, 1] - start[1]) - dy * (middle[:, 0] - start[0])) / length
+
+            farthest = int(np.argmax(distances))
+            if distances[farthest] > tolerance:
+                split = first + 1 + farthest
+                keep[split] = True
+                stack.append((first, split))
+                stack.append((split, last))
+
+        return [tuple(point) for point in points[keep].tolist()]
+
+    def preprocess_path(self, points: list, spacing: float = constants.TRACK_RESAMPLE_SPACING,
+                        tolerance: float = constants.TRACK_SIMPLIFY_TOLERANCE,
+                        window: int = constants.TRACK_SMOOTHING_WINDOW) -> list:
+        """
+            Smooth, resample and simplify the drawn points before they are expanded into a track.
+
+            Args:
+                points (list): List of points representing the track.
+                spacing (float): The arc-length spacing of the resampled points.
+                tolerance (float): The simplification tolerance in pixels.
+                window (int): The smoothing window in points.
+
+            Returns:
+                list: The preprocessed points.
+        """
+
+        return self.simplify_path(self.resample_path(
+            self.smooth_path(points, window), spacing), tolerance)
+
+    def expand_path(self, points: list, thickness: int, closed: bool = False) -> tuple:
         """
             Expand the given points into an outer and inner path.
 
+            Every vertex is offset along the bisector of its two segments (a miter join), so both paths keep
+            the track width through turns. On the outside of a turn sharper than `TRACK_MITER_LIMIT` the miter
+            is clipped square at that limit, still half the thickness from the centerline. On the inside the
+            full miter is kept, and the loop it makes with the neighbouring segments is cut by `_remove_loops`.
+
             Args:
                 points (list): List of points representing the track.
                 thickness (int): The thickness of the track.
+                closed (bool): Treat the points as a loop, joining the last point back to the first.
 
             Returns:
                 tuple: Two lists of points representing the inner and outer paths.
         """
-        outer_points = []
-        inner_points = []
 
-        for i in range(len(points) - 1):
-            p1 = points[i]
-            p2 = points[i + 1]
-            perpendicular_vector = self.get_perpendicular_vector(
-                p1, p2, thickness / 2)
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        offset = thickness / 2
+
+        # Repeated points make zero length segments without a direction
+        if len(points) > 1:
+            points = points[np.concatenate(
+                ([True], np.any(np.diff(points, axis=0) != 0, axis=1)))]
+        if closed and len(points) > 1 and np.array_equal(points[0], points[-1]):
+            points = points[:-1]
+        closed = closed and len(points) > 2
+
+        if len(points) < 2:
+            single = [tuple(point) for point in points.tolist()]
+            return single, list(single)
+
+        following = np.roll(points, -1, axis=0) if closed else points[1:]
+        segments = following - points[:len(following)]
+        lengths = np.hypot(*segments.T)
+        directions = segments / lengths[:, None]
+        arc = np.concatenate(([0.0], np.cumsum(lengths)))
+        normals = np.column_stack((-directions[:, 1], directions[:, 0]))
+
+        # Each vertex joins the segment before it and the segment after it
+        if closed:
+            normals_before, normals_after = np.roll(normals, 1, axis=0), normals
+            directions_before, directions_after = np.roll(directions, 1, axis=0), directions
+        else:
+            normals_before = np.vstack((normals[:1], normals))
+            normals_after = np.vstack((normals, normals[-1:]))
+            directions_before = np.vstack((directions[:1], directions))
+            directions_after = np.vstack((directions, directions[-1:]))
+
+        turn = directions_before[:, 0] * directions_after[:, 1] - \
+            directions_before[:, 1] * directions_after[:, 0]
+        bisector = normals_before + normals_after
+        bisector_length = np.hypot(*bisector.T)
+        u_turn = bisector_length < 1e-9
 
-            outer_points.append(
-                (p1[0] + perpendicular_vector[0], p1[1] + perpendicular_vector[1]))
-            inner_points.append(
-                (p1[0] - perpendicular_vector[0], p1[1] - perpendicular_vector[1]))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # |n1 + n2| = 2 cos(a / 2), and the miter is offset / cos(a / 2) long
+            miter_scale = np.where(u_turn, np.inf, 2 / bisector_length)
+            bisector = np.where(u_turn[:, None], directions_before,
+                                bisector / bisector_length[:, None])
+        # How far along each segment the two offset lines on the inside of a turn cross, offset * tan(a / 2)
+        half_span = offset * np.sqrt(np.maximum(miter_scale ** 2 - 1, 0))
+        too_sharp = miter_scale > constants.TRACK_MITER_LIMIT
+        reach = constants.TRACK_LOOP_REACH * thickness
 
-        outer_points.append(
-            (points[-1][0] + perpendicular_vector[0], points[-1][1] + perpendicular_vector[1]))
-        inner_points.append(
-            (points[-1][0] - perpendicular_vector[0], points[-1][1] - perpendicular_vector[1]))
+        boundaries = []
+        for side in (-1, 1):
+            # A turn towards the other side leaves this side on the outside of the corner
+            outside = (side * turn < 0) | u_turn
+            # Offset lines crossing beyond the whole centerline never close a loop to cut
+            looped = ~outside & too_sharp & (half_span <= arc[-1])
+            repeats = np.where(too_sharp, 2, 1)
 
+            corners = np.repeat(points, repeats, axis=0)
+            miter = side * bisector * (offset * np.where(too_sharp, 0, miter_scale))[:, None]
+            offsets = np.repeat(miter, repeats, axis=0)
+
+            # A sharp corner keeps to the offset lines of both its segments. On the outside they end where they
+            # meet a line across the bisector `TRACK_MITER_LIMIT` offsets out. On the inside they run on past
+            # the full miter, so they cross the neighbouring segments and the loop is cut there
+            normal_before = side * normals_before[too_sharp]
+            normal_after = side * normals_after[too_sharp]
+            outward = np.where(u_turn[too_sharp, None], directions_before[too_sharp], side * bisector[too_sharp])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                clip = (constants.TRACK_MITER_LIMIT * offset - offset * np.sum(normal_before * outward, axis=1)) / \
+                    np.sum(directions_before[too_sharp] * outward, axis=1)
+            along = np.where(outside[too_sharp], clip,
+                             np.where(looped[too_sharp], half_span[too_sharp] + offset, reach / 2))[:, None]
+
+            split_starts = np.flatnonzero(np.repeat(too_sharp, repeats))[::2]
+            offsets[split_starts] = offset * normal_before + along * directions_before[too_sharp]
+            offsets[split_starts + 1] = offset * normal_after - along * directions_after[too_sharp]
+
+            # The loop of a sharp corner spans twice its half span of centerline, which may be more than `reach`
+            loop_arc = self._skip_stretches(arc, arc[:len(points)][looped], half_span[looped])
+            path = self._remove_loops(corners + offsets, np.repeat(loop_arc[:len(points)], repeats),
+                                      reach, loop_arc[-1] if closed else None)
+            if closed:
+                path = np.vstack((path, path[:1]))
+            boundaries.append([tuple(point) for point in path.tolist()])
+
+        inner_points, outer_points = boundaries
         return inner_points, outer_points
 
-    def draw_paths(self, screen: pygame.surface, inner_points: list, outer_points: list) -> None:
+    def _skip_stretches(self, arc: np.ndarray, centers: np.ndarray, half_lengths: np.ndarray) -> np.ndarray:
+        # Arc length that does not count the stretches of centerline within half_lengths of each center
+        starts = np.maximum(centers - half_lengths, 0)
+        ends = np.minimum(centers + half_lengths, arc[-1])
+        if not len(starts):
+            return arc
+
+        # Merge the stretches that overlap
+        order = np.argsort(starts)
+        starts, ends = starts[order], np.maximum.accumulate(ends[order])
+        new = np.r_[True, starts[1:] > ends[:-1]]
+        starts, ends = starts[new], ends[np.r_[new[1:], True]]
+
+        skipped_before = np.concatenate(([0.0], np.cumsum(ends - starts)))
+        stretch = np.maximum(np.searchsorted(starts, arc, side="right") - 1, 0)
+        skipped = skipped_before[stretch] + np.clip(arc - starts[stretch], 0, ends[stretch] - starts[stretch])
+
+        return arc - skipped
+
+    def _crossings(self, path: np.ndarray, arc: np.ndarray, reach: float, period: float = None) -> tuple:
+        """
+            Find the pairs of segments of a path that cross and are at most `reach` apart along the centerline.
+
+            Only the segments that share a cell of a `SegmentGrid` are tested. On a closed path, where the last
+            point joins back to the first, the second segment of a pair that wraps past the start is numbered
+            on from the last segment.
+
+            Returns: (tuple) The first and second segment of every crossing, ordered by first then second segment
+        """
+
+        vertices = np.vstack((path, path[:1])) if period is not None else path
+        segments = np.hstack((vertices[:-1], vertices[1:]))
+        count = len(segments)
+
+        # Cells a few segments wide keep the pairs to test few however dense the points are
+        lengths = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+        cell_size = np.clip(4 * np.median(lengths), 2, constants.TRACK_INDEX_CELL_SIZE)
+
+        first, second = SegmentGrid(segments, cell_size).candidates_in_boxes(
+            np.minimum(segments[:, 0], segments[:, 2]), np.minimum(segments[:, 1], segments[:, 3]),
+            np.maximum(segments[:, 0], segments[:, 2]), np.maximum(segments[:, 1], segments[:, 3]))
+
+        if period is not None:
+            second = np.where(second < first, second + count, second)
+            arc = np.concatenate((arc, arc + period, arc[:1] + 2 * period))
+            nearby = (second - first >= 2) & (second - first <= count - 2)
+        else:
+            nearby = second - first >= 2
+
+        # From the end of the first segment to the start of the second
+        nearby &= arc[second] - arc[first + 1] <= reach
+        first, second = first[nearby], second[nearby]
+
+        # Where along each segment they meet, parallel segments never make a loop
+        x1, y1, x2, y2 = segments[first].T
+        x3, y3, x4, y4 = segments[second % count].T
+        denominator = (x2 - x1) * (y4 - y3) - (y2 - y1) * (x4 - x3)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = ((x3 - x1) * (y4 - y3) - (y3 - y1) * (x4 - x3)) / denominator
+            u = ((x3 - x1) * (y2 - y1) - (y3 - y1) * (x2 - x1)) / denominator
+        crossing = (denominator != 0) & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+
+        # A pair sharing several cells is listed once for each
+        pairs = np.unique(first[crossing] * 2 * count + second[crossing])
+
+        return pairs // (2 * count), pairs % (2 * count)
+
+    def _remove_loops(self, path: np.ndarray, arc: np.ndarray, reach: float, period: float = None) -> np.ndarray:
+        """
+            Cut out the loops an offset path makes where the track bends tighter than its half width.
+
+            Two segments are tested against each other when the centerline between the points they were offset
+            from is at most `reach` long, whatever the spacing of the points, so the crossings of a track that
+            really runs over itself are kept. When two of them cross, the vertices between them are replaced by
+            the crossing point, and the path is searched again until no loop is left.
+
+            Args:
+                path (np.ndarray): The (N, 2) offset points.
+                arc (np.ndarray): The centerline arc length of the point each one was offset from, never decreasing.
+                reach (float): The longest stretch of centerline a loop can span.
+                period (float): The length of the centerline of a closed path, None for an open one.
+
+            Returns:
+                np.ndarray: The points of the path without loops.
+        """
+
+        if period is not None:
+            return self._remove_closed_loops(path, arc, reach, period)
+
+        while len(path) > 3:
+            first, second = self._crossings(path, arc, reach)
+            if not len(first):
+                break
+
+            # Cut the widest loop starting at each segment, the pairs come ordered by segment
+            widest = np.r_[first[1:] != first[:-1], True]
+            kept = []
+            kept_arc = []
+            resume = 0
+            for i, j in zip(first[widest].tolist(), second[widest].tolist()):
+                if i < resume:
+                    continue
+
+                x1, y1, x2, y2 = *path[i], *path[i + 1]
+                x3, y3, x4, y4 = *path[j], *path[j + 1]
+                denominator = (x2 - x1) * (y4 - y3) - (y2 - y1) * (x4 - x3)
+                t = ((x3 - x1) * (y4 - y3) - (y3 - y1) * (x4 - x3)) / denominator
+
+                kept += [path[resume:i + 1], [(x1 + t * (x2 - x1), y1 + t * (y2 - y1))]]
+                kept_arc += [arc[resume:i + 1], arc[i:i + 1]]
+                resume = j + 1
+
+            path = np.vstack(kept + [path[resume:]])
+            arc = np.concatenate(kept_arc + [arc[resume:]])
+
+        return path
+
+    def _remove_closed_loops(self, path: np.ndarray, arc: np.ndarray, reach: float, period: float) -> np.ndarray:
+        # Start the loop at a vertex outside every loop, cut it open there, and put the first point back first
+        count = len(path)
+        if count < 4:
+            return path
+
+        first, second = self._crossings(path, arc, reach, period)
+
+        inside = np.zeros(2 * count + 1, dtype=int)
+        np.add.at(inside, first + 1, 1)
+        np.add.at(inside, second + 1, -1)
+        inside = np.cumsum(inside)[:2 * count]
+        outside = np.flatnonzero((inside[:count] + inside[count:]) == 0)
+        if not len(outside):
+            return path
+
+        shift = outside[0]
+        rolled = np.roll(path, -shift, axis=0)
+        rolled_arc = np.concatenate((arc[shift:], arc[:shift] + period)) - arc[shift]
+
+        opened = self._remove_loops(np.vstack((rolled, rolled[:1])), np.append(rolled_arc, period), reach)[:-1]
+        start = np.flatnonzero((opened == path[0]).all(axis=1))
+
+        return np.roll(opened, -start[0], axis=0) if len(start) else opened
+
+    def draw_paths(self, screen, inner_points: list, outer_points: list) -> None:
         """
             Draw the inner and outer paths on the Pygame screen.
 
@@ -78,12 +410,37 @@ class Tracks:
             Returns: None
         """
 
+        import pygame
+
         if inner_points and outer_points:
             pygame.draw.lines(screen, constants.BLUE_COLOR,
                               False, inner_points, 2)
             pygame.draw.lines(screen, constants.BLUE_COLOR,
                               False, outer_points, 2)
 
+    def draw_region(self, screen, track_index, rect) -> None:
+        """
+            Redraw only the part of the track inside a rectangle, looking the segments up in the track index.
+
+            Args:
+                screen (pygame.Surface): The pygame surface to draw on.
+                track_index (TrackIndex): The spatial index over the track.
+                rect (pygame.Rect): The part of the screen to redraw.
+
+            Returns: None
+        """
+
+        import pygame
+
+        screen.set_clip(rect)
+        screen.fill(constants.BLACK_COLOR, rect)
+
+        for x1, y1, x2, y2 in track_index.segments_in_box(rect.left, rect.top, rect.right, rect.bottom, closed=False):
+            pygame.draw.line(screen, constants.BLUE_COLOR,
+                             (x1, y1), (x2, y2), 2)
+
+        screen.set_clip(None)
+
     def erase_points(self, points: list, eraser_position: tuple, eraser_radius: int) -> list:
         """
             Erase points that are within the eraser radius from the given position.
@@ -0,0 +1,54 @@
+import numpy as np
+
+
+class Observation:
+    """
+        What the model sees of a car each step, kept in one float32 array that is written in place every frame.
+
+        The layout matches a row of `Population.observe`: speed, the sensor distances, then points.
+        `ModelInputs` stays the validated form for loading and saving, see `from_model_inputs` and `to_model_inputs`.
+    """
+
+    __slots__ = ("values", "sensors")
+
+    def __init__(self, number_of_sensors: int) -> None:
+        self.values = np.zeros(number_of_sensors + 2, dtype=np.float32)
+        self.sensors = self.values[1:-1]
+
+    @property
+    def speed(self) -> float:
+        return float(self.values[0])
+
+    @speed.setter
+    def speed(self, value: float) -> None:
+        self.values[0] = value
+
+    @property
+    def points(self) -> float:
+        return float(self.values[-1])
+
+    @points.setter
+    def points(self, value: float) -> None:
+        self.values[-1] = value
+
+    def update(self, speed: float, sensors, points: float) -> None:
+        """
+            Overwrites the observation in place.
+        """
+
+        self.values[0] = speed
+        self.sensors[:] = sensors
+        self.values[-1] = points
+
+    @classmethod
+    def from_model_inputs(cls, model_inputs) -> "Observation":
+        observation = cls(len(model_inputs.sensors))
+        observation.update(model_inputs.speed, model_inputs.sensors, model_inputs.points)
+
+        return observation
+
+    def to_model_inputs(self):
+        # pydantic is only loaded when crossing this boundary
+        from src.schemas.model_inputs import ModelInputs
+
+        return ModelInputs(speed=self.speed, sensors=self.sensors.tolist(), points=self.points)
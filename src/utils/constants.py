@@ -10,6 +10,13 @@ FINAL_SCREEN = "final"
 
 FPS = 60
 
+# Simulation timing, one physics step advances the cars as far as one frame used to
+
+PHYSICS_STEPS_PER_SECOND = 60
+SIMULATION_SPEED = 1.0
+SIMULATION_SPEEDS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+SIMULATION_MAX_STEPS_PER_FRAME = 256
+
 # Game screen dimensions
 
 SCREEN_HEIGHT = 620
@@ -33,6 +40,35 @@ BLUE_COLOR = (0, 0, 255)
 # Editing
 
 ERASER_RADIUS = 5
+DIRTY_RECT_MARGIN = 6
+
+# Track spatial index
+
+TRACK_INDEX_CELL_SIZE = 25
+
+# Track files
+
+TRACKS_DIRECTORY = "tracks"
+TRACK_FILE_EXTENSION = ".track"
+
+# Track preprocessing
+
+TRACK_SMOOTHING_WINDOW = 5
+TRACK_RESAMPLE_SPACING = 10
+TRACK_SIMPLIFY_TOLERANCE = 1.5
+
+# Track expansion
+
+TRACK_MITER_LIMIT = 2.0
+TRACK_CLOSING_DISTANCE = 40
+# Centerline length, in track widths, within which a boundary crossing itself is a loop to cut
+TRACK_LOOP_REACH = 4
+
+# Track progress
+
+TRACK_PROGRESS_CELL_SIZE = 25
+TRACK_PROGRESS_CHECKPOINTS = 10
+TRACK_PROGRESS_REWARD_FACTOR = 0.1
 
 # Track sizes
 
@@ -49,6 +85,73 @@ CAR_ANGLE = 0
 CAR_INITIAL_SPEED = 0
 CAR_TURNING_RADIUS = 5
 CAR_SIZE = 2
+CAR_SPRITE_ANGLE_STEP = 5
 CAR_BODY_FILE_PATH = "src//assets//car.png"
 CAR_POINTS_FACTOR = 0.1
 CAR_INITIAL_POINTS = 0
+
+# Sensor constants
+
+SENSOR_MAX_DISTANCE = 100
+SENSOR_SPREAD = 180
+SENSOR_DIRECTIONS = {
+    3: [0, 45, -45],
+    5: [0, 45, -45, 90, -90],
+}
+
+# Collision constants
+
+COLLISION_MODES = ("segments", "mask", "swept")
+COLLISION_MODE = "segments"
+# How far, in pixels, the corners of a turning car may stray from their true path while it is swept
+COLLISION_SWEEP_TOLERANCE = 0.5
+
+# Population constants
+
+POPULATION_CHUNK_SIZE = 64
+
+# Policy constants
+
+POLICY_HIDDEN_LAYERS = (8,)
+POLICY_NUMBER_OF_ACTIONS = 2
+
+# Genetic algorithm constants
+
+GENETIC_POPULATION_SIZE = 100
+GENETIC_WORKERS = 4
+GENETIC_ELITE_SIZE = 5
+GENETIC_TOURNAMENT_SIZE = 3
+GENETIC_MUTATION_RATE = 0.1
+GENETIC_MUTATION_SCALE = 0.5
+GENETIC_MAX_STEPS = 1000
+GENETIC_TIME_BUDGET = None
+
+# Rollout control, a car is culled after this many steps without getting this much further
+
+ROLLOUT_STAGNATION_STEPS = 120
+ROLLOUT_STAGNATION_DISTANCE = 10
+
+# Episodes
+
+EPISODE_MAX_STEPS = None
+EPISODE_HISTORY = 1000
+
+# Checkpoints
+
+CHECKPOINT_DIRECTORY = "checkpoints"
+CHECKPOINT_EVERY = 10
+CHECKPOINT_KEEP = 3
+
+# Experience recording
+
+EXPERIENCE_RECORDING = False
+EXPERIENCE_DIRECTORY = "experience"
+EXPERIENCE_CHUNK_SIZE = 4096
+EXPERIENCE_BUFFERS = 4
+
+# Profiler constants
+
+PROFILER_ENABLED = False
+PROFILER_WINDOW = 600
+PROFILER_HISTOGRAM_BINS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 16.7, 33.3)
+PROFILER_EXPORT_PATH = "profile.json"
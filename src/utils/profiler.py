@@ -0,0 +1,172 @@
+import csv
+import json
+import time
+
+from collections import deque
+
+import numpy as np
+
+from src.utils import constants
+
+
+class _NullStage:
+    """
+        Stand-in returned by a disabled profiler, entering and leaving it does nothing.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("samples", "start")
+
+    def __init__(self, samples: deque) -> None:
+        self.samples = samples
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.samples.append(time.perf_counter() - self.start)
+
+
+class Profiler:
+    def __init__(self, enabled: bool = constants.PROFILER_ENABLED, window: int = constants.PROFILER_WINDOW) -> None:
+        """
+            Times the stages of a frame and keeps a rolling window of samples per stage.
+
+            Use `with profiler.stage("name"):` around a stage. While disabled, `stage` hands back a
+            shared object that does nothing, so the instrumentation can stay in the hot path.
+
+            Args:
+                enabled (bool): To record timings
+                window (int): The number of most recent samples kept per stage
+
+            Returns:
+                None
+        """
+
+        self.enabled = enabled
+        self.window = window
+        self.show_overlay = enabled
+        self.samples = {}
+        self.calls = {}
+        self.stages = {}
+        self.font = None
+
+    def stage(self, name: str):
+        """
+            Returns a context manager timing one call of the named stage.
+        """
+
+        if not self.enabled:
+            return _NULL_STAGE
+
+        stage = self.stages.get(name)
+        if stage is None:
+            self.samples[name] = deque(maxlen=self.window)
+            self.calls[name] = 0
+            stage = self.stages[name] = _Stage(self.samples[name])
+
+        self.calls[name] += 1
+        return stage
+
+    def reset(self) -> None:
+        """
+            Forgets every recorded sample and call count.
+        """
+
+        self.samples.clear()
+        self.calls.clear()
+        self.stages.clear()
+
+    def summary(self) -> dict:
+        """
+            Summarises the rolling window of every stage.
+
+            Returns: (dict) Per stage, the call count, mean and percentiles in milliseconds and a histogram
+        """
+
+        summary = {}
+        bins = np.array(constants.PROFILER_HISTOGRAM_BINS_MS)
+
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+
+            milliseconds = np.fromiter(samples, dtype=np.float64) * 1000
+            p50, p95, p99 = np.percentile(milliseconds, (50, 95, 99))
+            histogram = np.bincount(np.searchsorted(bins, milliseconds), minlength=len(bins) + 1)
+
+            summary[name] = {
+                "calls": self.calls[name],
+                "mean_ms": float(milliseconds.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "max_ms": float(milliseconds.max()),
+                "histogram": histogram.tolist(),
+            }
+
+        return summary
+
+    def export_json(self, path: str) -> None:
+        """
+            Writes the summary, with the histogram bin edges, to a JSON file.
+        """
+
+        with open(path, "w") as file:
+            json.dump({"histogram_bins_ms": list(constants.PROFILER_HISTOGRAM_BINS_MS),
+                       "stages": self.summary()}, file, indent=4)
+
+    def export_csv(self, path: str) -> None:
+        """
+            Writes one row per stage with its call count, mean and percentiles to a CSV file.
+        """
+
+        columns = ["calls", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["stage", *columns])
+            for name, stats in self.summary().items():
+                writer.writerow([name, *(stats[column] for column in columns)])
+
+    def draw_overlay(self, screen):
+        """
+            Draws the mean and 95th percentile time of every stage, left of the game points.
+
+            Returns: (pygame.Rect) The area drawn on, None when the overlay is hidden
+        """
+
+        if not (self.enabled and self.show_overlay):
+            return None
+
+        import pygame
+
+        if self.font is None:
+            self.font = pygame.font.Font(None, 20)
+
+        x, y = constants.SCREEN_WIDTH - 380, 10
+        area = pygame.Rect(x, y, 0, 0)
+        for name, stats in self.summary().items():
+            text = self.font.render(
+                f"{name}: {stats['mean_ms']:.2f} ms (p95 {stats['p95_ms']:.2f})", True, constants.WHITE_COLOR)
+            area.union_ip(screen.blit(text, (x, y)))
+            y += 16
+
+        return area
+
+
+profiler = Profiler()